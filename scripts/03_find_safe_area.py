@@ -1,10 +1,17 @@
 # scripts/03_compare_safe_area.py
 
+import os
+import sys
+
 import qrcode
 from PIL import Image
 
 from qrcode.constants import ERROR_CORRECT_H
 
+# パッケージ側の描画関数 (overlay.py) を使うため、src/pixcelqr を import パスに追加します
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "pixcelqr"))
+from overlay import render_safe_area_map
+
 def create_original_qr_image(matrix, box_size=20, border=4):
     """
     QRコードの設計図(matrix)から、通常の白黒画像を生成します。
@@ -88,30 +95,7 @@ def main():
     safe_area_map = get_safe_area_map(matrix)
 
     box_size = 20
-    size = len(matrix)
-    map_img = Image.new("RGB", (size * box_size, size * box_size), "white")
-    map_draw_context = map_img.load()
-    
-    colors = {
-        1: (255, 100, 100), # 赤: ファインダー
-        2: (100, 100, 255), # 青: アライメント
-        3: (255, 255, 100), # 黄: タイミング
-        4: (200, 200, 200), # 灰: その他
-    }
-
-    for r, row in enumerate(safe_area_map):
-        for c, area_type in enumerate(row):
-            original_color_is_black = matrix[r][c]
-            
-            if area_type == 0: # データ領域
-                draw_color = (0, 0, 0) if original_color_is_black else (255, 255, 255)
-            else: # 機能パターン領域
-                draw_color = colors[area_type]
-
-            x_start, y_start = c * box_size, r * box_size
-            for i in range(box_size):
-                for j in range(box_size):
-                    map_draw_context[x_start + i, y_start + j] = draw_color
+    map_img = render_safe_area_map(matrix, safe_area_map, box_size=box_size)
 
     print("\n次に、機能パターンを色分けした地図を表示します。")
     print("赤: ファインダー, 青: アライメント, 黄: タイミング")
@@ -1,7 +1,13 @@
 # scripts/04_dynamic_safe_area.py
 
+import os
+import sys
+
 import qrcode
-from PIL import Image
+
+# パッケージ側の描画関数 (overlay.py) を使うため、src/pixcelqr を import パスに追加します
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "pixcelqr"))
+from overlay import render_safe_area_map
 
 # QRコードのバージョン毎のアライメントパターンの中心座標のリスト
 # 仕様書から引用したデータです
@@ -90,28 +96,8 @@ def main():
     safe_area_map = get_safe_area_map(matrix)
     
     box_size = 15 # 少し小さくして見やすくします
-    map_img = Image.new("RGB", (size * box_size, size * box_size), "white")
-    map_draw_context = map_img.load()
-    
-    colors = {
-        1: (255, 100, 100), # 赤: ファインダー
-        2: (100, 100, 255), # 青: アライメント
-        3: (255, 255, 100), # 黄: タイミング
-        4: (200, 200, 200), # 灰: その他
-    }
+    map_img = render_safe_area_map(matrix, safe_area_map, box_size=box_size)
 
-    for r, row in enumerate(safe_area_map):
-        for c, area_type in enumerate(row):
-            is_black = matrix[r][c]
-            draw_color = (0, 0, 0) if is_black else (255, 255, 255) # デフォルトは元の色
-            if area_type in colors:
-                draw_color = colors[area_type]
-
-            x_start, y_start = c * box_size, r * box_size
-            for i in range(box_size):
-                for j in range(box_size):
-                    map_draw_context[x_start + i, y_start + j] = draw_color
-    
     print("\n次に、機能パターンを正しく色分けした地図を表示します。")
     map_img.show()
     map_img.save("qr_dynamic_safe_area_map.png")
@@ -4,8 +4,14 @@
 QRコードのバージョン1から40までのを塗りつぶします。
 """
 
+import os
+import sys
+
 import qrcode
-from PIL import Image
+
+# パッケージ側の描画関数 (overlay.py) を使うため、src/pixcelqr を import パスに追加します
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "pixcelqr"))
+from overlay import render_safe_area_map
 
 # QRコードのバージョン1から40までの、完全なアライメントパターン中心座標データ
 # QRコードの国際規格(ISO/IEC 18004)に基づいています
@@ -114,25 +120,8 @@ def main():
     safe_area_map = get_safe_area_map(matrix)
     
     box_size = 10
-    map_img = Image.new("RGB", (size * box_size, size * box_size), "white")
-    map_draw_context = map_img.load()
-    
-    colors = {
-        1: (255, 100, 100), 2: (100, 100, 255), 3: (255, 255, 100), 4: (200, 200, 200)
-    }
-
-    for r, row in enumerate(safe_area_map):
-        for c, area_type in enumerate(row):
-            is_black = matrix[r][c]
-            draw_color = (0, 0, 0) if is_black else (255, 255, 255)
-            if area_type in colors:
-                draw_color = colors[area_type]
-
-            x_start, y_start = c * box_size, r * box_size
-            for i in range(box_size):
-                for j in range(box_size):
-                    map_draw_context[x_start + i, y_start + j] = draw_color
-    
+    map_img = render_safe_area_map(matrix, safe_area_map, box_size=box_size)
+
     print("\n次に、機能パターンを正しく色分けした地図を表示します。")
     map_img.show()
     map_img.save("qr_full_safe_area_map.png")
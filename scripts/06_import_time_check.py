@@ -0,0 +1,74 @@
+# scripts/06_import_time_check.py
+
+"""
+python -X importtime を使って、generator や GUI の入口 (main) などの起動時間をチェックします。
+- 重い依存 (qrcode, PIL, pyzbar, numpy, cv2) が import 時に読み込まれていないこと
+- 累積の import 時間が予算 (IMPORT_BUDGET_US) 以内であること
+どちらかを満たさなければ終了コード1で終わるので、回帰テストとして使えます。
+"""
+
+import os
+import subprocess
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "pixcelqr")
+
+# チェックするモジュールと、その累積 import 時間の予算 (マイクロ秒)
+# main は tkinter (約 6ms) を読み込むので、その分だけ予算を多めにしています
+IMPORT_BUDGET_US = {
+    "generator": 20_000,
+    "cache": 60_000,
+    "batch": 60_000,
+    "main": 40_000,
+}
+
+# 起動時に読み込まれていたら NG にするモジュール (tkinter は GUI に必要なので含めない)
+HEAVY_MODULES = ("qrcode", "PIL", "pyzbar", "numpy", "cv2")
+
+
+def measure_import(module_name):
+    """
+    新しいプロセスで module_name を import し、
+    (累積 import 時間[us], 読み込まれたトップレベルモジュールの集合) を返します。
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module_name}"],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    cumulative_us = None
+    loaded = set()
+    # 各行は "import time: self [us] | cumulative | imported package" の形式
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        loaded.add(name.split(".")[0])
+        if name == module_name:
+            cumulative_us = int(cumulative)
+    return cumulative_us, loaded
+
+
+def main():
+    failed = False
+    for module_name, budget_us in IMPORT_BUDGET_US.items():
+        cumulative_us, loaded = measure_import(module_name)
+        heavy = sorted(name for name in HEAVY_MODULES if name in loaded)
+
+        status = "OK"
+        if heavy or cumulative_us > budget_us:
+            status = "NG"
+            failed = True
+        print(f"[{status}] {module_name}: {cumulative_us} us (予算 {budget_us} us)")
+        if heavy:
+            print(f"    起動時に重いモジュールが読み込まれています: {', '.join(heavy)}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# scripts/07_refiner_budget_check.py
+
+"""
+flip_dot で既に手を入れたQRコードを ArtRefiner で仕上げても、読み取れるままかをチェックします。
+- 各RSブロックを訂正能力いっぱいまで flip_dot で壊してから (この時点では読み取れる)
+- margin=0 で焼きなましをかけ、結果を書き戻して qrdecode で読み取れること
+- refiner が数えたブロックごとの誤りの数が、base_matrix との実際の差と一致すること
+を確認し、失敗があれば終了コード1で終わるので、回帰テストとして使えます。
+"""
+
+import os
+import sys
+
+import numpy as np
+
+# パッケージ側のモジュールを使うため、src/pixcelqr を import パスに追加します
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "pixcelqr"))
+import qrspec
+from generator import (
+    ERROR_CORRECT_H, ERROR_CORRECT_L, ERROR_CORRECT_M, ERROR_CORRECT_Q, QArtGenerator,
+)
+from qrdecode import decode_matrix
+from refiner import ArtRefiner
+
+# 表示用の名前
+LEVEL_NAMES = {ERROR_CORRECT_L: "L", ERROR_CORRECT_M: "M", ERROR_CORRECT_Q: "Q", ERROR_CORRECT_H: "H"}
+
+# (データ, バージョン, 誤り訂正レベル)
+CASES = [
+    ("https://example.com/refiner/a", 6, ERROR_CORRECT_H),
+    ("https://example.com/refiner/b", 6, ERROR_CORRECT_M),
+    ("HELLO", 1, ERROR_CORRECT_L),
+    ("https://example.com/refiner/c", 2, ERROR_CORRECT_L),
+]
+
+
+def block_errors(qart):
+    """base_matrix と比べて、RSブロックごとに壊れているコード語の数を数えます。"""
+    _, codeword_block = qrspec.block_layout(qart.version, qart.error_correction)
+    cw_map = qrspec.codeword_map(qart.version)
+    changed = (np.array(qart.matrix) != np.array(qart.base_matrix)) & (cw_map >= 0)
+    broken = np.unique(cw_map[changed])
+    return np.bincount(codeword_block[broken], minlength=codeword_block.max() + 1).tolist()
+
+
+def fill_to_budget(qart, rng):
+    """各ブロックで、訂正能力と同じ数のコード語を flip_dot で1マスずつ壊します。"""
+    _, codeword_block = qrspec.block_layout(qart.version, qart.error_correction)
+    cw_map = qrspec.codeword_map(qart.version)
+    safe = np.array(qart.safe_area_map) == 0
+    first_module = {}
+    for row, col in zip(*np.nonzero(safe & (cw_map >= 0))):
+        first_module.setdefault(int(cw_map[row, col]), (int(row), int(col)))
+
+    for block, budget in enumerate(qrspec.error_budget(qart.version, qart.error_correction)):
+        codewords = [cw for cw in first_module if codeword_block[cw] == block]
+        for cw in rng.choice(codewords, budget, replace=False):
+            qart.flip_dot(*first_module[int(cw)])
+
+
+def main():
+    failed = False
+    for seed, (data, version, error_correction) in enumerate(CASES):
+        rng = np.random.default_rng(seed)
+        qart = QArtGenerator(data, error_correction=error_correction, version=version)
+        fill_to_budget(qart, rng)
+        readable_before = decode_matrix(qart.matrix) == data
+
+        refiner = ArtRefiner(qart, rng.random((qart.size, qart.size)), margin=0)
+        stats = refiner.run(iterations=50_000, seed=seed)
+        refiner.apply()
+
+        readable_after = decode_matrix(qart.matrix) == data
+        counted_ok = stats["block_errors"] == block_errors(qart)
+
+        status = "OK"
+        if not (readable_before and readable_after and counted_ok):
+            status = "NG"
+            failed = True
+        print(f"[{status}] {version}-{LEVEL_NAMES[error_correction]} {data!r}: "
+              f"編集後 {readable_before}, 仕上げ後 {readable_after}, "
+              f"誤りの数 {stats['block_errors']} (予算 {stats['block_budget']})")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# scripts/08_batch_verify_check.py
+
+"""
+検証器の verify_batch (コンタクトシートでまとめて読み取り) が、1枚ずつの verify と
+同じ結果になるかをチェックします。
+- 1枚で読み取れるコードを、まとめて読み取ったときに見落としていないこと
+- まとめて読み取ったときだけ読み取れる、ということもないこと
+読み込めない検証器 (ライブラリがないなど) は SKIP とし、
+不一致があれば終了コード1で終わるので、回帰テストとして使えます。
+"""
+
+import os
+import sys
+
+# パッケージ側のモジュールを使うため、src/pixcelqr を import パスに追加します
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "pixcelqr"))
+from generator import QArtGenerator
+from verify import OpenCVVerifier, get_verifier
+
+# (表示名, 検証器を作る関数)。OpenCV は既定では1枚ずつ読むので、シートで読む場合も別に確かめる
+VERIFIERS = [
+    (name, lambda name=name: get_verifier(name))
+    for name in ("pyzbar", "opencv", "matrix", "all:opencv,matrix")
+] + [("opencv (contact_sheet=True)", lambda: OpenCVVerifier(contact_sheet=True))]
+
+# (ケース名, データのリスト)
+CASES = [
+    ("同じ長さ4枚", [f"code {i}" for i in range(4)]),
+    ("長さが違う9枚", [f"https://example.com/{'x' * (i * 7)}" for i in range(9)]),
+    ("1枚", ["single"]),
+]
+
+
+def make_images(data_list):
+    images = []
+    for index, data in enumerate(data_list):
+        qart = QArtGenerator(data)
+        # 何枚かは少し絵を描いた (読み取れる範囲で壊した) 状態にする
+        for step in range(index * 3):
+            qart.flip_dot(qart.size // 2 + step % 5, qart.size // 2 + step // 5)
+        images.append(qart.generate_image())
+    return images
+
+
+def main():
+    failed = False
+    for verifier_name, make_verifier in VERIFIERS:
+        verifier = make_verifier()
+        for case_name, data_list in CASES:
+            images = make_images(data_list)
+            try:
+                single = [verifier.verify(image, data) for image, data in zip(images, data_list)]
+            except (ImportError, OSError) as e:
+                print(f"[SKIP] {verifier_name}: {e}")
+                break
+            batch = verifier.verify_batch(images, data_list)
+
+            status = "OK"
+            if batch != single:
+                status = "NG"
+                failed = True
+            print(f"[{status}] {verifier_name} {case_name}: 1枚ずつ {sum(single)}/{len(single)}, "
+                  f"まとめて {sum(batch)}/{len(batch)}")
+            for index, (one, many) in enumerate(zip(single, batch)):
+                if one != many:
+                    print(f"    {index}: {data_list[index]!r} 1枚ずつ {one}, まとめて {many}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
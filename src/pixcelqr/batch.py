@@ -0,0 +1,85 @@
+# src/pixcelqr/batch.py
+
+"""
+テキストファイルの1行を1つのQRコードとして、まとめて画像を生成するスクリプト。
+同じ入力はキャッシュ(ArtifactStore)から取り出すので、再実行は速く終わります。
+キャッシュになかったものは --verify-batch 個ずつ集めて、verify_batch でまとめて検証します。
+"""
+
+import argparse
+import os
+
+from cache import ArtifactStore, build_artifact, lookup_cached, store_artifact
+from profiling import metrics
+from verify import get_verifier
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="PixcelQR batch generator")
+    parser.add_argument("input", help="1行に1つのデータを書いたテキストファイル")
+    parser.add_argument("-o", "--output-dir", default="output")
+    parser.add_argument("--cache-dir", default=".pixcelqr-cache")
+    parser.add_argument("--cache-max-mb", type=int, default=512)
+    parser.add_argument("--box-size", type=int, default=10)
+    parser.add_argument("--border", type=int, default=4)
+    parser.add_argument(
+        "--verifier", default="pyzbar",
+        help="pyzbar / opencv / matrix, または all:pyzbar,opencv のような組み合わせ",
+    )
+    parser.add_argument(
+        "--verify-batch", type=int, default=16,
+        help="キャッシュになかったコードを何個ずつまとめて検証するか",
+    )
+    parser.add_argument("--profile", action="store_true", help="終了時に処理時間の集計を表示する")
+    parser.add_argument("--profile-trace", help="計測結果を1呼び出しずつ書き出すJSONLファイル")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.profile or args.profile_trace:
+        metrics.enable(trace_path=args.profile_trace)
+
+    store = ArtifactStore(args.cache_dir, max_bytes=args.cache_max_mb * 1024 * 1024)
+    verifier = get_verifier(args.verifier)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    with open(args.input, "r", encoding="utf-8") as f:
+        lines = [line.rstrip("\n") for line in f if line.strip()]
+
+    batch_size = max(1, args.verify_batch)
+    for start in range(0, len(lines), batch_size):
+        chunk = lines[start:start + batch_size]
+        artifacts = []
+        misses = []
+        for offset, data in enumerate(chunk):
+            key, cached = lookup_cached(
+                store, data, box_size=args.box_size, border=args.border, verifier=verifier
+            )
+            artifacts.append(cached)
+            if cached is None:
+                qart, image = build_artifact(data, box_size=args.box_size, border=args.border)
+                misses.append((offset, key, qart, image))
+
+        # キャッシュになかったものは、1回の verify_batch でまとめて検証する
+        if misses:
+            readable_list = verifier.verify_batch(
+                [image for _, _, _, image in misses], [chunk[offset] for offset, _, _, _ in misses]
+            )
+            for (offset, key, qart, image), readable in zip(misses, readable_list):
+                metrics.increment("batch.verify.success" if readable else "batch.verify.failure")
+                artifacts[offset] = store_artifact(store, key, qart, image, readable)
+
+        for offset, (data, artifact) in enumerate(zip(chunk, artifacts)):
+            filepath = os.path.join(args.output_dir, f"{start + offset:04d}.png")
+            artifact.image.save(filepath)
+            status = "Readable" if artifact.report["readable"] else "UNREADABLE!"
+            print(f"{filepath}: [{status}] {data}")
+
+    if args.profile:
+        print(metrics.summary())
+    metrics.disable()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+# src/pixcelqr/cache.py
+
+"""
+同じ入力 (データ・アート・オプション) から作られる成果物をディスクに保存し、
+バッチ実行をまたいで再利用するためのキャッシュです。
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import TYPE_CHECKING, NamedTuple
+
+from generator import ERROR_CORRECT_H, QArtGenerator, __version__
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+class CachedArtifact(NamedTuple):
+    matrix: list
+    report: dict
+    image: "Image.Image"
+
+
+def make_key(data, flips=(), error_correction=ERROR_CORRECT_H, box_size=10, border=4,
+             verifier_name="pyzbar"):
+    """
+    入力とパッケージのバージョンから、安定したキー(sha256)を作ります。
+    """
+    payload = {
+        "data": data,
+        "flips": sorted([int(r), int(c)] for r, c in flips),
+        "error_correction": error_correction,
+        "box_size": box_size,
+        "border": border,
+        "verifier": verifier_name,
+        "version": __version__,
+    }
+    text = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ArtifactStore:
+    """
+    キーごとに <key>.png (画像) と <key>.json (行列とレポート) を保存します。
+    - 書き込みは一時ファイル + os.replace で行うので、読み手が書きかけを見ることはありません
+    - .json を最後に書くので、.json があるエントリだけを「完成品」として扱います
+    - 合計サイズが max_bytes を超えたら、古いものから削除します
+    複数プロセスから同時に使っても、消えたファイルは単なるキャッシュミスとして扱います。
+
+    put のたびにディレクトリ全体を調べると N 件で O(N^2) になるので、合計サイズは
+    書き込んだ分を足していく見積もりで持ち、見積もりが max_bytes を超えたときか
+    scan_interval 回の put ごと (他のプロセスの書き込みを拾うため) にだけ evict で数え直します。
+    削除するときは max_bytes の low_water 倍まで減らすので、いっぱいの状態でも毎回は数え直しません。
+    """
+
+    def __init__(self, root, max_bytes=512 * 1024 * 1024, scan_interval=256, tmp_max_age=3600,
+                 low_water=0.9):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.low_water = low_water
+        self.scan_interval = scan_interval
+        self.tmp_max_age = tmp_max_age  # これより古い .tmp は落ちたワーカーの書きかけとみなす
+        self._estimated_bytes = None    # None なら次の put で数え直す
+        self._puts_since_scan = 0
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key, ext):
+        return os.path.join(self.root, f"{key}.{ext}")
+
+    def _write_atomic(self, path, write):
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+            return os.path.getsize(path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def get(self, key):
+        """
+        キャッシュがあれば CachedArtifact を、なければ None を返します。
+        """
+        from PIL import Image
+
+        json_path = self._path(key, "json")
+        png_path = self._path(key, "png")
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            with Image.open(png_path) as img:
+                img.load()
+                image = img.copy()
+        except (OSError, json.JSONDecodeError):
+            return None
+
+        # 最近使ったものを残せるように、更新時刻を新しくしておく
+        for path in (json_path, png_path):
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                pass
+
+        matrix = [[cell == "1" for cell in row] for row in entry["matrix"]]
+        return CachedArtifact(matrix, entry["report"], image)
+
+    def put(self, key, matrix, report, image):
+        png_path = self._path(key, "png")
+        json_path = self._path(key, "json")
+        entry = {
+            "matrix": ["".join("1" if cell else "0" for cell in row) for row in matrix],
+            "report": report,
+        }
+        written = self._write_atomic(png_path, lambda f: image.save(f, format="PNG"))
+        written += self._write_atomic(
+            json_path,
+            lambda f: f.write(json.dumps(entry, ensure_ascii=False).encode("utf-8")),
+        )
+
+        self._puts_since_scan += 1
+        if self._estimated_bytes is not None:
+            self._estimated_bytes += written
+        if (self._estimated_bytes is None or self._estimated_bytes > self.max_bytes
+                or self._puts_since_scan >= self.scan_interval):
+            self.evict()
+
+    def evict(self):
+        """
+        合計サイズが max_bytes を超えていたら、max_bytes * low_water 以下になるまで
+        更新時刻の古いエントリを削除します。
+        tmp_max_age より古い .tmp (書き込み中に落ちたワーカーの残り) もここで削除します。
+        """
+        entries = {}
+        total = 0
+        now = time.time()
+        for name in os.listdir(self.root):
+            key, ext = os.path.splitext(name)
+            if ext not in (".json", ".png", ".tmp"):
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                stat = os.stat(path)
+                if ext == ".tmp":
+                    # 書き込み中のものは消さないよう、十分に古いものだけを消す
+                    if now - stat.st_mtime > self.tmp_max_age:
+                        os.remove(path)
+                    continue
+            except FileNotFoundError:
+                continue
+            size, mtime = entries.get(key, (0, 0.0))
+            entries[key] = (size + stat.st_size, max(mtime, stat.st_mtime))
+            total += stat.st_size
+
+        self._puts_since_scan = 0
+        self._estimated_bytes = total
+        if total <= self.max_bytes:
+            return
+
+        target = self.max_bytes * self.low_water
+        for key, (size, _) in sorted(entries.items(), key=lambda item: item[1][1]):
+            # .json を先に消して、エントリを「未完成」にしてから画像を消す
+            for ext in ("json", "png"):
+                try:
+                    os.remove(self._path(key, ext))
+                except FileNotFoundError:
+                    pass
+            total -= size
+            if total <= target:
+                break
+        self._estimated_bytes = total
+
+
+def lookup_cached(store, data, flips=(), error_correction=ERROR_CORRECT_H, box_size=10, border=4,
+                  verifier=None):
+    """
+    (キー, キャッシュにあった CachedArtifact または None) を返します。
+    見つからなかったときは、build_artifact で作って検証し、store_artifact でそのキーに保存します。
+    """
+    verifier_name = "pyzbar" if verifier is None else verifier.name
+    key = make_key(data, flips, error_correction, box_size, border, verifier_name)
+    return key, store.get(key)
+
+
+def build_artifact(data, flips=(), error_correction=ERROR_CORRECT_H, box_size=10, border=4):
+    """
+    QArtGenerator で行列を作り、flips のドットを反転して (qart, 画像) を返します (検証はしません)。
+    """
+    qart = QArtGenerator(data, error_correction=error_correction)
+    for row, col in flips:
+        qart.flip_dot(row, col)
+    return qart, qart.generate_image(box_size=box_size, border=border)
+
+
+def store_artifact(store, key, qart, image, readable):
+    """検証結果と一緒にキャッシュへ保存し、CachedArtifact を返します。"""
+    report = {
+        "readable": readable,
+        "version": qart.version,
+        "size": qart.size,
+    }
+    store.put(key, qart.matrix, report, image)
+    return CachedArtifact(qart.matrix, report, image)
+
+
+def generate_cached(store, data, flips=(), error_correction=ERROR_CORRECT_H, box_size=10, border=4,
+                    verifier=None):
+    """
+    キャッシュにあればそれを返し、なければ QArtGenerator で生成・検証して保存します。
+    flips は反転させるドットの (row, col) のリストです。
+    verifier を省略すると is_readable の既定 (pyzbar) で検証します。
+    たくさんまとめて作るときは、lookup_cached で集めたキャッシュミスを
+    verifier.verify_batch で一度に検証する方が速くなります (batch.py を参照)。
+    """
+    key, cached = lookup_cached(store, data, flips, error_correction, box_size, border, verifier)
+    if cached is not None:
+        return cached
+
+    qart, image = build_artifact(data, flips, error_correction, box_size, border)
+    return store_artifact(store, key, qart, image, qart.is_readable(verifier))
@@ -1,8 +1,19 @@
 # src/pixcelqr/generator.py
 
-import qrcode
-from PIL import Image
-from pyzbar.pyzbar import decode
+# qrcode / PIL / pyzbar は重いので、実際に使うメソッドの中で import します。
+# (pyzbar は読み込むだけで libzbar をロードするため、検証しない処理では不要です)
+
+from collections import OrderedDict
+
+from profiling import metrics, timed
+
+__version__ = "0.1.0"
+
+# qrcode.constants の誤り訂正レベルと同じ値 (qrcode を import せずに使うため)
+ERROR_CORRECT_L = 1
+ERROR_CORRECT_M = 0
+ERROR_CORRECT_Q = 3
+ERROR_CORRECT_H = 2
 
 # (ALIGNMENT_PATTERN_COORDS の長いリストは前回と同じなので、ここでは省略します)
 ALIGNMENT_PATTERN_COORDS = {
@@ -21,10 +32,86 @@ ALIGNMENT_PATTERN_COORDS = {
     40: [6, 30, 58, 86, 114, 142, 170]
 }
 
+# サイズごとの Zobrist テーブル (マスごとの64bit乱数)
+_ZOBRIST_TABLES = {}
+
+
+def _zobrist_table(size):
+    """
+    size x size の Zobrist テーブルを返します。
+    毎回同じ値になるよう、乱数は splitmix64 で決定的に作ります。
+    """
+    table = _ZOBRIST_TABLES.get(size)
+    if table is None:
+        mask64 = (1 << 64) - 1
+        state = size
+        table = []
+        for _ in range(size):
+            row = []
+            for _ in range(size):
+                state = (state + 0x9E3779B97F4A7C15) & mask64
+                z = state
+                z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & mask64
+                z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & mask64
+                row.append(z ^ (z >> 31))
+            table.append(row)
+        _ZOBRIST_TABLES[size] = table
+    return table
+
+
+class ReadabilityCache:
+    """
+    is_readable の結果を (データ, サイズ, 行列のハッシュ) をキーに覚えておく LRU キャッシュ。
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, readable):
+        self._entries[key] = readable
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
 class QArtGenerator:
-    def __init__(self, data, error_correction=qrcode.constants.ERROR_CORRECT_H):
+    # 全インスタンスで共有する読み取り結果のキャッシュ
+    readability_cache = ReadabilityCache()
+
+    def __init__(self, data, error_correction=ERROR_CORRECT_H, version=None):
+        """
+        version を省略すると、データが収まる一番小さいバージョンを使います。
+        (planner.choose_plan で選んだバージョンを指定することもできます)
+        """
         self.data = data
         self.error_correction = error_correction
+        self.requested_version = version
         self._generate()
 
     def update_data(self, new_data):
@@ -34,16 +121,36 @@ class QArtGenerator:
         self.data = new_data
         self._generate()
 
+    @timed("_generate")
     def _generate(self):
-        qr = qrcode.QRCode(error_correction=self.error_correction)
+        import qrcode
+
+        qr = qrcode.QRCode(version=self.requested_version, error_correction=self.error_correction)
         qr.add_data(self.data)
-        qr.make(fit=True)
+        qr.make(fit=self.requested_version is None)
         
         self.matrix = qr.modules
+        # flip_dot で書き換える前の、符号化したままの行列 (誤りの数を数える基準)
+        self.base_matrix = [row[:] for row in qr.modules]
         self.version = qr.version
         self.size = qr.modules_count
         self.safe_area_map = self._create_safe_area_map()
+        self.rehash()
+
+    def rehash(self):
+        """
+        行列全体から Zobrist ハッシュを計算し直します。
+        flip_dot を使わずに self.matrix を直接書き換えたときは、これを呼んでください。
+        """
+        table = _zobrist_table(self.size)
+        matrix_hash = 0
+        for r, row_data in enumerate(self.matrix):
+            for c, is_black in enumerate(row_data):
+                if is_black:
+                    matrix_hash ^= table[r][c]
+        self.matrix_hash = matrix_hash
 
+    @timed("_create_safe_area_map")
     def _create_safe_area_map(self):
         mask = [[0] * self.size for _ in range(self.size)]
         
@@ -74,14 +181,20 @@ class QArtGenerator:
                             mask[y_center + r][x_center + c] = 2
         return mask
 
+    @timed("flip_dot")
     def flip_dot(self, row, col):
         if 0 <= row < self.size and 0 <= col < self.size:
             if self.safe_area_map[row][col] == 0:
                 self.matrix[row][col] = not self.matrix[row][col]
+                # 反転したマスの乱数を XOR するだけでハッシュを O(1) で更新できる
+                self.matrix_hash ^= _zobrist_table(self.size)[row][col]
                 return True
         return False
 
+    @timed("generate_image")
     def generate_image(self, box_size=10, border=4):
+        from PIL import Image
+
         image_size = (self.size + border * 2) * box_size
         img = Image.new("L", (image_size, image_size), "white")
         draw_context = img.load()
@@ -96,9 +209,26 @@ class QArtGenerator:
                             draw_context[x_start + i, y_start + j] = 0
         return img
 
-    def is_readable(self):
+    @timed("is_readable")
+    def is_readable(self, verifier=None):
+        """
+        画像にして読み取れるかを確認します。
+        verifier を省略すると pyzbar (verify.PyzbarVerifier) を使います。
+        """
+        if verifier is None:
+            from verify import PyzbarVerifier
+
+            verifier = PyzbarVerifier()
+
+        key = (self.data, self.size, self.matrix_hash, verifier.name)
+        cached = self.readability_cache.get(key)
+        if cached is not None:
+            metrics.increment("is_readable.cache_hit")
+            return cached
+
         img = self.generate_image()
-        decoded = decode(img)
-        if decoded:
-            return decoded[0].data.decode("utf-8") == self.data
-        return False
+        metrics.increment("is_readable.attempts")
+        readable = verifier.verify(img, self.data)
+        metrics.increment("is_readable.success" if readable else "is_readable.failure")
+        self.readability_cache.put(key, readable)
+        return readable
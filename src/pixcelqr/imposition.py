@@ -0,0 +1,207 @@
+# src/pixcelqr/imposition.py
+
+"""
+たくさんのQRコードを、印刷用の大きな1枚のシートに並べる (面付けする) モジュール。
+
+コードごとに PIL の画像を作って貼り付けるのではなく、モジュールの行列を
+NumPy のバッファの決まった位置へ直接書き込みます。シートは横長の帯 (band) に分けて描画し、
+PNG にも帯ごとに書き出すので、A0・600dpi のような大きなシートでもメモリは帯の分だけで済みます。
+
+    sheet = Imposition(qarts, sheet="A3", dpi=600, labels=[q.data for q in qarts])
+    sheet.write_png("sheet.png", workers=4)
+"""
+
+import os
+import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+MM_PER_INCH = 25.4
+
+# 縦向きのシートの大きさ (幅, 高さ) [mm]
+SHEET_SIZES_MM = {
+    "A0": (841, 1189),
+    "A1": (594, 841),
+    "A2": (420, 594),
+    "A3": (297, 420),
+    "A4": (210, 297),
+}
+
+
+def mm_to_px(mm, dpi):
+    return int(round(mm / MM_PER_INCH * dpi))
+
+
+class Placement:
+    def __init__(self, x, y, modules, box_size, label):
+        self.x = x
+        self.y = y
+        self.modules = modules  # ボーダー込みの bool 配列
+        self.box_size = box_size
+        self.size_px = modules.shape[0] * box_size
+        self.label = label
+
+
+class Imposition:
+    def __init__(self, codes, sheet="A4", dpi=600, code_mm=25.0, gap_mm=6.0, margin_mm=10.0,
+                 border=4, labels=None, label_mm=3.0, crop_marks=True, band_height=512):
+        """
+        codes は QArtGenerator か、その matrix と同じ形の二次元リストのリストです。
+        コードは code_mm 角に収まる最大の整数ピクセルでモジュールを描きます。
+        """
+        width_mm, height_mm = SHEET_SIZES_MM[sheet] if isinstance(sheet, str) else sheet
+        self.dpi = dpi
+        self.width = mm_to_px(width_mm, dpi)
+        self.height = mm_to_px(height_mm, dpi)
+        self.band_height = band_height
+        self.crop_marks = crop_marks
+        self.mark_length = mm_to_px(min(gap_mm / 2, 3.0), dpi)
+        self.mark_width = max(1, mm_to_px(0.1, dpi))
+        self.label_height = mm_to_px(label_mm, dpi) if labels is not None else 0
+
+        matrices = [np.array(getattr(code, "matrix", code), dtype=bool) for code in codes]
+        code_px = mm_to_px(code_mm, dpi)
+        gap = mm_to_px(gap_mm, dpi)
+        margin = mm_to_px(margin_mm, dpi)
+        cell_w = code_px + gap
+        cell_h = code_px + self.label_height + gap
+        columns = max(0, (self.width - 2 * margin + gap) // cell_w)
+        rows = max(0, (self.height - 2 * margin + gap) // cell_h)
+        if len(matrices) > columns * rows:
+            raise ValueError(
+                f"{len(matrices)} 個のコードは1枚に収まりません (最大 {columns * rows} 個)"
+            )
+
+        self.placements = []
+        for index, matrix in enumerate(matrices):
+            modules = np.pad(matrix, border)
+            box_size = code_px // modules.shape[0]
+            if box_size < 1:
+                raise ValueError(f"code_mm={code_mm} では {dpi}dpi でモジュールを描けません")
+            x = margin + (index % columns) * cell_w
+            y = margin + (index // columns) * cell_h
+            label = labels[index] if labels is not None else None
+            self.placements.append(Placement(x, y, modules, box_size, label))
+
+    def _marks(self, p):
+        """1つのコードの四隅のトンボ (y0, x0, y1, x1) のリストを返します。"""
+        length, width = self.mark_length, self.mark_width
+        left, top = p.x, p.y
+        right, bottom = p.x + p.size_px, p.y + p.size_px
+        rects = []
+        for cx, sx in ((left, -1), (right, 1)):
+            for cy, sy in ((top, -1), (bottom, 1)):
+                # 横線と縦線 (コードの外側に向かって伸ばす)
+                x0, x1 = sorted((cx, cx + sx * length))
+                y0, y1 = sorted((cy, cy + sy * length))
+                rects.append((cy - width // 2, x0, cy - width // 2 + width, x1))
+                rects.append((y0, cx - width // 2, y1, cx - width // 2 + width))
+        return rects
+
+    def _draw_label(self, band, y0, y1, p):
+        from PIL import Image, ImageDraw, ImageFont
+
+        top = p.y + p.size_px
+        if top >= y1 or top + self.label_height <= y0:
+            return
+        try:
+            font = ImageFont.load_default(size=max(8, int(self.label_height * 0.8)))
+        except TypeError:
+            font = ImageFont.load_default()
+        label_img = Image.new("L", (p.size_px, self.label_height), 255)
+        ImageDraw.Draw(label_img).text((p.size_px // 2, 0), p.label, fill=0, font=font, anchor="ma")
+        label = np.asarray(label_img)
+
+        a, b = max(y0, top), min(y1, top + self.label_height)
+        x1 = min(p.x + p.size_px, self.width)
+        band[a - y0:b - y0, p.x:x1] = np.minimum(
+            band[a - y0:b - y0, p.x:x1], label[a - top:b - top, :x1 - p.x]
+        )
+
+    def render_band(self, y0, y1, out=None):
+        """
+        シートの y0 <= y < y1 の部分を描画した uint8 配列 (0=黒, 255=白) を返します。
+        out を渡すと、その配列に直接書き込みます。
+        """
+        band = out if out is not None else np.empty((y1 - y0, self.width), dtype=np.uint8)
+        band.fill(255)
+
+        for p in self.placements:
+            if p.y < y1 and p.y + p.size_px > y0:
+                a, b = max(y0, p.y), min(y1, p.y + p.size_px)
+                # 帯にかかるモジュールの行だけを拡大する
+                first_row = (a - p.y) // p.box_size
+                last_row = (b - 1 - p.y) // p.box_size + 1
+                rows = p.modules[first_row:last_row]
+                block = np.repeat(np.repeat(rows, p.box_size, axis=0), p.box_size, axis=1)
+                offset = a - (p.y + first_row * p.box_size)
+                band[a - y0:b - y0, p.x:p.x + p.size_px] = np.where(
+                    block[offset:offset + (b - a)], 0, 255
+                )
+
+            if self.crop_marks:
+                for my0, mx0, my1, mx1 in self._marks(p):
+                    ya, yb = max(y0, my0), min(y1, my1)
+                    xa, xb = max(0, mx0), min(self.width, mx1)
+                    if ya < yb and xa < xb:
+                        band[ya - y0:yb - y0, xa:xb] = 0
+
+            if p.label:
+                self._draw_label(band, y0, y1, p)
+        return band
+
+    def _bands(self):
+        return [(y, min(y + self.band_height, self.height)) for y in range(0, self.height, self.band_height)]
+
+    def render(self, workers=None):
+        """
+        シート全体を1つの配列に描画します。帯ごとにスレッドプールで並列に描きます。
+        """
+        sheet = np.empty((self.height, self.width), dtype=np.uint8)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(lambda band: self.render_band(*band, out=sheet[band[0]:band[1]]),
+                              self._bands()))
+        return sheet
+
+    def iter_bands(self, workers=None):
+        """
+        上から順に (y0, 帯の配列) を返すジェネレータ。
+        先読みする帯の数を制限しているので、メモリは (workers * 2) 帯分で済みます。
+        """
+        workers = workers or min(32, (os.cpu_count() or 1) + 4)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = []
+            for band in self._bands():
+                pending.append((band[0], executor.submit(self.render_band, *band)))
+                if len(pending) >= workers * 2:
+                    y0, future = pending.pop(0)
+                    yield y0, future.result()
+            for y0, future in pending:
+                yield y0, future.result()
+
+    def write_png(self, path, workers=None, compress_level=6):
+        """
+        シートをグレースケールの PNG として、帯ごとに書き出します。
+        """
+        def chunk(tag, data):
+            return (struct.pack(">I", len(data)) + tag + data
+                    + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF))
+
+        pixels_per_meter = int(round(self.dpi / MM_PER_INCH * 1000))
+        compressor = zlib.compressobj(compress_level)
+        with open(path, "wb") as f:
+            f.write(b"\x89PNG\r\n\x1a\n")
+            f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", self.width, self.height, 8, 0, 0, 0, 0)))
+            f.write(chunk(b"pHYs", struct.pack(">IIB", pixels_per_meter, pixels_per_meter, 1)))
+            for _, band in self.iter_bands(workers):
+                # 各行の先頭にフィルタ種別 0 (None) を付ける
+                rows = np.empty((band.shape[0], band.shape[1] + 1), dtype=np.uint8)
+                rows[:, 0] = 0
+                rows[:, 1:] = band
+                data = compressor.compress(rows.tobytes())
+                if data:
+                    f.write(chunk(b"IDAT", data))
+            f.write(chunk(b"IDAT", compressor.flush()))
+            f.write(chunk(b"IEND", b""))
@@ -1,9 +1,9 @@
 # src/pixcelqr/main.py
 
+import argparse
 import tkinter as tk
-from tkinter import filedialog
-from PIL import ImageTk
 from generator import QArtGenerator
+from profiling import metrics
 
 class Application(tk.Frame):
     def __init__(self, master=None):
@@ -16,6 +16,7 @@ class Application(tk.Frame):
         self.initial_data = "https://www.ah-soft.com/vocaloid/yukari/"
 
         self.qart = QArtGenerator(self.initial_data)
+        self.overlay_key = None
         
         self.create_widgets()
         self.update_canvas()
@@ -39,6 +40,13 @@ class Application(tk.Frame):
         self.save_button = tk.Button(control_frame, text="Save Image", command=self.save_image)
         self.save_button.pack(side=tk.LEFT)
 
+        # 描画できないマス (機能パターン) を色分けして重ねるかどうか
+        self.show_overlay = tk.BooleanVar(value=False)
+        self.overlay_check = tk.Checkbutton(
+            control_frame, text="Safe Area", variable=self.show_overlay, command=self.update_overlay
+        )
+        self.overlay_check.pack(side=tk.LEFT, padx=5)
+
         # --- QRコード表示用のキャンバスを作成 ---
         image_width = (self.qart.size + self.border * 2) * self.box_size
         image_height = (self.qart.size + self.border * 2) * self.box_size
@@ -47,6 +55,8 @@ class Application(tk.Frame):
         self.canvas.bind("<Button-1>", self.on_canvas_click)
 
     def update_canvas(self):
+        from PIL import ImageTk
+
         # キャンバスのサイズを現在のQRコードに合わせて変更
         new_width = (self.qart.size + self.border * 2) * self.box_size
         new_height = (self.qart.size + self.border * 2) * self.box_size
@@ -54,9 +64,36 @@ class Application(tk.Frame):
 
         self.qr_image_pil = self.qart.generate_image(box_size=self.box_size, border=self.border)
         self.qr_image_tk = ImageTk.PhotoImage(self.qr_image_pil)
-        self.canvas.create_image(0, 0, anchor=tk.NW, image=self.qr_image_tk)
+        self.canvas.delete("qr")
+        self.canvas.create_image(0, 0, anchor=tk.NW, image=self.qr_image_tk, tags="qr")
+        self.update_overlay()
         self.check_readability()
 
+    def update_overlay(self):
+        """
+        聖域の地図を半透明のレイヤーとして重ねる (チェックボックスで表示を切り替え)。
+        レイヤーは表示するときに、バージョンが変わっていれば作り直します。
+        切り替えでは下の画像を描き直しません。
+        """
+        if not self.show_overlay.get():
+            self.canvas.itemconfigure("overlay", state=tk.HIDDEN)
+            return
+
+        # overlay は numpy を読み込むので、起動を遅くしないよう初めて表示するときに import する
+        from PIL import ImageTk
+        from overlay import safe_area_overlay
+
+        key = (self.qart.version, self.box_size, self.border)
+        if key != self.overlay_key:
+            overlay = safe_area_overlay(self.qart, box_size=self.box_size, border=self.border)
+            self.overlay_tk = ImageTk.PhotoImage(overlay)
+            self.canvas.delete("overlay")
+            self.canvas.create_image(0, 0, anchor=tk.NW, image=self.overlay_tk, tags="overlay")
+            self.overlay_key = key
+
+        self.canvas.itemconfigure("overlay", state=tk.NORMAL)
+        self.canvas.tag_raise("overlay")
+
     def on_canvas_click(self, event):
         border_pixels = self.border * self.box_size
         col = (event.x - border_pixels) // self.box_size
@@ -74,6 +111,8 @@ class Application(tk.Frame):
 
     def save_image(self):
         """保存ボタンが押されたときの処理"""
+        from tkinter import filedialog
+
         filepath = filedialog.asksaveasfilename(
             defaultextension=".png",
             filetypes=[("PNG files", "*.png"), ("All files", "*.*")],
@@ -90,10 +129,19 @@ class Application(tk.Frame):
         else:
             self.master.title("PixcelQR Generator - [UNREADABLE!]")
 
-def main(): 
+def main():
+    parser = argparse.ArgumentParser(description="PixcelQR Generator")
+    parser.add_argument("--profile", action="store_true", help="終了時に処理時間の集計を表示する")
+    args = parser.parse_args()
+    if args.profile:
+        metrics.enable()
+
     root = tk.Tk()
     app = Application(master=root)
     app.mainloop()
 
+    if args.profile:
+        print(metrics.summary())
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,72 @@
+# src/pixcelqr/overlay.py
+
+"""
+safe_area_map (聖域の地図) を色分けして描画するモジュール。GUI とスクリプトの両方から使います。
+
+- safe_area_overlay: 機能パターンだけを半透明で塗った RGBA のレイヤー (GUI で重ねる用)
+- render_safe_area_map: データ領域は元の白黒、機能パターンは色分けした RGB 画像 (スクリプト用)
+
+どちらもマスごとの色を NumPy のパレット参照で決め、box_size 倍に拡大するだけなので、
+ピクセルごとのループはありません。
+"""
+
+import numpy as np
+
+# safe_area_map の値ごとの色
+SAFE_AREA_COLORS = {
+    1: (255, 100, 100),  # 赤: ファインダー
+    2: (100, 100, 255),  # 青: アライメント
+    3: (255, 255, 100),  # 黄: タイミング
+    4: (200, 200, 200),  # 灰: その他 (セパレータなど)
+}
+
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+
+# (version, box_size, border, alpha) -> RGBA の PIL 画像
+_overlay_cache = {}
+
+
+def _upscale(cells, box_size, border, fill=0):
+    """(size, size, channels) のマスの色を、ボーダーを付けて box_size 倍に拡大します。"""
+    cells = np.pad(cells, ((border, border), (border, border), (0, 0)), constant_values=fill)
+    return np.repeat(np.repeat(cells, box_size, axis=0), box_size, axis=1)
+
+
+def safe_area_overlay(qart, box_size=10, border=4, alpha=128):
+    """
+    機能パターンを半透明で塗り、描画できるマスは透明にした RGBA 画像を返します。
+    safe_area_map はバージョンだけで決まるので、(version, box_size, border, alpha) ごとに
+    キャッシュします。返した画像は書き換えないでください。
+    """
+    from PIL import Image
+
+    key = (qart.version, box_size, border, alpha)
+    overlay = _overlay_cache.get(key)
+    if overlay is None:
+        palette = np.zeros((5, 4), dtype=np.uint8)  # 0 (データ領域) は透明
+        for area_type, color in SAFE_AREA_COLORS.items():
+            palette[area_type] = (*color, alpha)
+        cells = palette[np.asarray(qart.safe_area_map, dtype=np.intp)]
+        overlay = Image.fromarray(_upscale(cells, box_size, border))
+        _overlay_cache[key] = overlay
+    return overlay
+
+
+def render_safe_area_map(matrix, safe_area_map, box_size=10, border=0):
+    """
+    データ領域 (0) は行列の白黒のまま、機能パターンは SAFE_AREA_COLORS で塗った RGB 画像を返します。
+    """
+    from PIL import Image
+
+    # パレットの 0..4 は safe_area_map の値、5 は白、6 は黒
+    palette = np.zeros((7, 3), dtype=np.uint8)
+    for area_type, color in SAFE_AREA_COLORS.items():
+        palette[area_type] = color
+    palette[5] = WHITE
+    palette[6] = BLACK
+
+    area = np.asarray(safe_area_map, dtype=np.intp)
+    is_black = np.asarray(matrix, dtype=bool)
+    index = np.where(area == 0, 5 + is_black, area)
+    return Image.fromarray(_upscale(palette[index], box_size, border, fill=255))
@@ -0,0 +1,152 @@
+# src/pixcelqr/planner.py
+
+"""
+データに対して、どのバージョン・誤り訂正レベルを使うと絵を描ける余地が一番大きいかを選ぶモジュール。
+
+qrcode の fit=True は「一番小さいバージョン」を選びますが、アート用には
+少し大きなバージョンや別の誤り訂正レベルの方が、描けるマスも訂正の余裕も多いことがあります。
+ここでは (バージョン, 誤り訂正レベル) の全候補を、容量の表とキャッシュ済みの
+機能パターンのマスクから計算だけで評価します (候補ごとに符号化はしません)。
+
+    plan = choose_plan(data, max_image_px=600, min_error_correction=ERROR_CORRECT_M)
+    qart = QArtGenerator(data, error_correction=plan.error_correction, version=plan.version)
+"""
+
+from functools import lru_cache
+from typing import NamedTuple
+
+import qrspec
+from generator import ERROR_CORRECT_H, ERROR_CORRECT_L, ERROR_CORRECT_M, ERROR_CORRECT_Q
+
+# 誤り訂正の強さの順 (L < M < Q < H)
+ROBUSTNESS = {ERROR_CORRECT_L: 0, ERROR_CORRECT_M: 1, ERROR_CORRECT_Q: 2, ERROR_CORRECT_H: 3}
+
+# 数字モードで、残りの桁数ごとのビット数
+_NUMBER_LENGTH = {0: 0, 1: 4, 2: 7}
+
+
+class Plan(NamedTuple):
+    version: int
+    error_correction: int
+    size: int                  # 1辺のモジュール数
+    image_px: int              # generate_image で作ったときの1辺のピクセル数
+    payload_bits: int          # データに必要なビット数
+    capacity_bits: int         # データ領域の容量 (ビット)
+    free_modules: int          # 機能パターン以外のマスの数
+    block_budgets: tuple       # RSブロックごとに訂正できるコード語の数
+    correctable_codewords: int
+    editable_modules: int      # 訂正能力の範囲で書き換えられるマスの数の目安
+
+
+@lru_cache(maxsize=None)
+def _candidate_table():
+    """
+    バージョンと誤り訂正レベルだけで決まる値を、全160候補分まとめて計算しておきます。
+    (version, error_correction, size, free_modules, block_budgets, capacity_bits,
+     count_bits_index, editable_modules)
+    """
+    table = []
+    for version in range(1, 41):
+        free = int((~qrspec.function_mask(version)).sum())
+        # 文字数指示子のビット数は 1-9, 10-26, 27-40 の3段階で変わる
+        count_bits_index = 0 if version < 10 else 1 if version < 27 else 2
+        for error_correction in ROBUSTNESS:
+            blocks, _ = qrspec.block_layout(version, error_correction)
+            budgets = tuple(qrspec.error_budget(version, error_correction))
+            capacity_bits = 8 * sum(data for _, data in blocks)
+            editable = min(free, sum(budgets) * 8)
+            table.append((version, error_correction, qrspec.version_to_size(version), free,
+                          budgets, capacity_bits, count_bits_index, editable))
+    return tuple(table)
+
+
+def _segment_bits(data, optimize=20):
+    """
+    QArtGenerator と同じ分割 (qrcode の add_data(optimize=20)) で、
+    (モード, 文字数, データ部分のビット数) のリストを返します。
+    """
+    from qrcode import util
+
+    chunks = util.optimal_data_chunks(data, minimum=optimize) if optimize else [util.QRData(data)]
+    segments = []
+    for chunk in chunks:
+        length = len(chunk)
+        if chunk.mode == util.MODE_NUMBER:
+            bits = 10 * (length // 3) + _NUMBER_LENGTH[length % 3]
+        elif chunk.mode == util.MODE_ALPHA_NUM:
+            bits = 11 * (length // 2) + 6 * (length % 2)
+        else:
+            bits = 8 * length
+        segments.append((chunk.mode, length, bits))
+    return segments
+
+
+def _needed_bits(data):
+    """
+    文字数指示子の3段階それぞれで、データに必要なビット数
+    (モード指示子 + 文字数指示子 + データ) を返します。
+    """
+    from qrcode import util
+
+    segments = _segment_bits(data)
+    return tuple(
+        sum(4 + util.mode_sizes_for_version(version)[mode] + bits for mode, _, bits in segments)
+        for version in (1, 10, 27)
+    )
+
+
+def _make_plan(row, needed, box_size, border):
+    version, error_correction, size, free, budgets, capacity, _, editable = row
+    return Plan(
+        version=version,
+        error_correction=error_correction,
+        size=size,
+        image_px=(size + border * 2) * box_size,
+        payload_bits=needed,
+        capacity_bits=capacity,
+        free_modules=free,
+        block_budgets=budgets,
+        correctable_codewords=sum(budgets),
+        editable_modules=editable,
+    )
+
+
+def plan_candidates(data, box_size=10, border=4):
+    """
+    データが収まるすべての (バージョン, 誤り訂正レベル) の Plan をリストで返します。
+    """
+    needed = _needed_bits(data)
+    return [
+        _make_plan(row, needed[row[6]], box_size, border)
+        for row in _candidate_table()
+        if needed[row[6]] <= row[5]
+    ]
+
+
+def choose_plan(data, max_image_px=None, min_error_correction=ERROR_CORRECT_L,
+                box_size=10, border=4):
+    """
+    条件 (画像の大きさの上限・最低限の誤り訂正レベル) を満たす候補のうち、
+    書き換えられるマスが一番多いものを返します。同じなら小さい画像、強い誤り訂正を優先します。
+    条件を満たす候補がなければ None を返します。
+    """
+    needed = _needed_bits(data)
+    min_rank = ROBUSTNESS[min_error_correction]
+    best_row = None
+    best_key = None
+    for row in _candidate_table():
+        _, error_correction, size, _, _, capacity, count_bits_index, editable = row
+        if needed[count_bits_index] > capacity:
+            continue
+        image_px = (size + border * 2) * box_size
+        if max_image_px is not None and image_px > max_image_px:
+            continue
+        rank = ROBUSTNESS[error_correction]
+        if rank < min_rank:
+            continue
+        key = (editable, -image_px, rank)
+        if best_key is None or key > best_key:
+            best_row, best_key = row, key
+    if best_row is None:
+        return None
+    return _make_plan(best_row, needed[best_row[6]], box_size, border)
@@ -0,0 +1,144 @@
+# src/pixcelqr/profiling.py
+
+"""
+QArtGenerator の各処理の呼び出し回数と時間を記録するための計測レイヤーです。
+既定では無効で、その間は @timed を付けた関数でもフラグを1回見るだけで済みます。
+
+    from profiling import metrics
+    metrics.enable()                 # trace_path を渡すと JSONL で1呼び出しずつ書き出す
+    ...
+    print(metrics.summary())         # snapshot() / to_prometheus() も使えます
+"""
+
+import functools
+import json
+import threading
+import time
+
+
+class Metrics:
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._timings = {}   # name -> [count, total, min, max] (秒)
+        self._counters = {}  # name -> int
+        self._trace_file = None
+
+    def enable(self, trace_path=None):
+        """
+        計測を有効にします。trace_path を指定すると、記録のたびに1行ずつJSONを追記します。
+        """
+        with self._lock:
+            if trace_path is not None and self._trace_file is None:
+                self._trace_file = open(trace_path, "a", encoding="utf-8")
+            self.enabled = True
+
+    def disable(self):
+        with self._lock:
+            self.enabled = False
+            if self._trace_file is not None:
+                self._trace_file.close()
+                self._trace_file = None
+
+    def reset(self):
+        with self._lock:
+            self._timings.clear()
+            self._counters.clear()
+
+    def record(self, name, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            stat = self._timings.get(name)
+            if stat is None:
+                self._timings[name] = [1, seconds, seconds, seconds]
+            else:
+                stat[0] += 1
+                stat[1] += seconds
+                stat[2] = min(stat[2], seconds)
+                stat[3] = max(stat[3], seconds)
+            self._write_trace({"type": "timing", "name": name, "seconds": seconds})
+
+    def increment(self, name, value=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+            self._write_trace({"type": "counter", "name": name, "value": value})
+
+    def _write_trace(self, event):
+        if self._trace_file is not None:
+            event["time"] = time.time()
+            self._trace_file.write(json.dumps(event) + "\n")
+
+    def snapshot(self):
+        """
+        現在の計測結果を辞書で返します。
+        """
+        with self._lock:
+            timings = {
+                name: {
+                    "count": count,
+                    "total_seconds": total,
+                    "mean_seconds": total / count,
+                    "min_seconds": min_seconds,
+                    "max_seconds": max_seconds,
+                }
+                for name, (count, total, min_seconds, max_seconds) in self._timings.items()
+            }
+            return {"timings": timings, "counters": dict(self._counters)}
+
+    def to_prometheus(self):
+        """
+        Prometheus のテキスト形式で計測結果を返します。
+        """
+        snap = self.snapshot()
+        lines = [
+            "# TYPE pixcelqr_call_seconds summary",
+        ]
+        for name, stat in sorted(snap["timings"].items()):
+            lines.append(f'pixcelqr_call_seconds_sum{{op="{name}"}} {stat["total_seconds"]:.9f}')
+            lines.append(f'pixcelqr_call_seconds_count{{op="{name}"}} {stat["count"]}')
+        lines.append("# TYPE pixcelqr_events_total counter")
+        for name, value in sorted(snap["counters"].items()):
+            lines.append(f'pixcelqr_events_total{{event="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """
+        終了時にコンソールへ表示するための、人が読みやすい集計表を返します。
+        """
+        snap = self.snapshot()
+        lines = [f"{'operation':<24}{'calls':>8}{'total[ms]':>12}{'mean[ms]':>12}{'max[ms]':>12}"]
+        for name, stat in sorted(snap["timings"].items(), key=lambda item: -item[1]["total_seconds"]):
+            lines.append(
+                f"{name:<24}{stat['count']:>8}"
+                f"{stat['total_seconds'] * 1000:>12.2f}"
+                f"{stat['mean_seconds'] * 1000:>12.3f}"
+                f"{stat['max_seconds'] * 1000:>12.3f}"
+            )
+        for name, value in sorted(snap["counters"].items()):
+            lines.append(f"{name:<24}{value:>8}")
+        return "\n".join(lines)
+
+
+# パッケージ全体で共有する計測オブジェクト
+metrics = Metrics()
+
+
+def timed(name):
+    """
+    関数の実行時間を metrics に記録するデコレータ。無効時はそのまま呼び出すだけです。
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                metrics.record(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
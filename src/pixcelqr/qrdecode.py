@@ -0,0 +1,332 @@
+# src/pixcelqr/qrdecode.py
+
+"""
+外部ライブラリ (zbar / OpenCV) を使わずに、QRコードを読み取るための小さなデコーダー。
+
+- decode_matrix: モジュールの行列 (True=黒) から文字列を取り出す
+- sample_matrix: generate_image で作ったような、傾きのない画像から行列を読み取る
+
+形式情報の読み取り → マスクの解除 → RS誤り訂正 → ビット列の解析、の順に処理します。
+カメラで撮った写真のような歪んだ画像は対象外です。
+"""
+
+import numpy as np
+
+import qrspec
+
+# ---- GF(256) の演算 (QRコードの原始多項式 x^8 + x^4 + x^3 + x^2 + 1) ----
+_EXP = [0] * 512
+_LOG = [0] * 256
+_value = 1
+for _i in range(255):
+    _EXP[_i] = _value
+    _LOG[_value] = _i
+    _value <<= 1
+    if _value & 0x100:
+        _value ^= 0x11D
+for _i in range(255, 512):
+    _EXP[_i] = _EXP[_i - 255]
+
+
+def _mul(a, b):
+    if a == 0 or b == 0:
+        return 0
+    return _EXP[_LOG[a] + _LOG[b]]
+
+
+def _div(a, b):
+    if a == 0:
+        return 0
+    return _EXP[(_LOG[a] - _LOG[b]) % 255]
+
+
+def _poly_eval_low(poly, x):
+    """係数が低次から並んだ多項式の値を求めます。"""
+    result = 0
+    for coef in reversed(poly):
+        result = _mul(result, x) ^ coef
+    return result
+
+
+def rs_correct(codewords, ec_count):
+    """
+    1ブロック分のコード語 (データ + 誤り訂正) の誤りを訂正したリストを返します。
+    訂正できないときは ValueError を送出します。
+    """
+    n = len(codewords)
+    received = list(codewords)
+
+    # シンドローム S_j = r(α^j)  (先頭のコード語が最高次の係数)
+    syndromes = []
+    for j in range(ec_count):
+        x = _EXP[j]
+        value = 0
+        for coef in received:
+            value = _mul(value, x) ^ coef
+        syndromes.append(value)
+    if not any(syndromes):
+        return received
+
+    # Berlekamp-Massey 法で誤り位置多項式 Λ(x) (低次から並べた係数) を求める
+    locator = [1] + [0] * ec_count
+    previous = [1] + [0] * ec_count
+    errors = 0
+    shift = 1
+    last_discrepancy = 1
+    for step in range(ec_count):
+        discrepancy = syndromes[step]
+        for i in range(1, errors + 1):
+            discrepancy ^= _mul(locator[i], syndromes[step - i])
+        if discrepancy == 0:
+            shift += 1
+            continue
+        coef = _div(discrepancy, last_discrepancy)
+        updated = list(locator)
+        for i in range(ec_count + 1 - shift):
+            updated[i + shift] ^= _mul(coef, previous[i])
+        if 2 * errors <= step:
+            previous = locator
+            errors = step + 1 - errors
+            last_discrepancy = discrepancy
+            shift = 1
+        else:
+            shift += 1
+        locator = updated
+    locator = locator[:errors + 1]
+    if 2 * errors > ec_count:
+        raise ValueError("誤りが多すぎて訂正できません")
+
+    # Chien 探索: Λ(α^-e) = 0 となる e が誤りの次数 (位置は n - 1 - e)
+    powers = [e for e in range(n) if _poly_eval_low(locator, _EXP[(255 - e) % 255]) == 0]
+    if len(powers) != errors:
+        raise ValueError("誤り位置を特定できません")
+
+    # Forney のアルゴリズムで誤りの値を求める
+    omega = [0] * ec_count
+    for i, s in enumerate(syndromes):
+        for k, l in enumerate(locator):
+            if i + k < ec_count:
+                omega[i + k] ^= _mul(s, l)
+    derivative = [locator[i] if i % 2 == 1 else 0 for i in range(1, len(locator))]
+    for e in powers:
+        x = _EXP[e]
+        x_inv = _EXP[(255 - e) % 255]
+        denominator = _poly_eval_low(derivative, x_inv)
+        if denominator == 0:
+            raise ValueError("誤りの値を計算できません")
+        magnitude = _mul(x, _div(_poly_eval_low(omega, x_inv), denominator))
+        received[n - 1 - e] ^= magnitude
+    return received
+
+
+# ---- 形式情報 ----
+def _format_candidates():
+    from qrcode.util import BCH_type_info
+
+    return [
+        (BCH_type_info((error_correction << 3) | mask_pattern), error_correction, mask_pattern)
+        for error_correction in range(4)
+        for mask_pattern in range(8)
+    ]
+
+
+_FORMAT_CANDIDATES = None
+
+
+def _read_format(matrix, size):
+    """
+    形式情報 (2か所に同じものがある) を読み取り、(誤り訂正レベル, マスク番号) を返します。
+    ハミング距離が3以下で最も近い正しい符号語を採用します。
+    """
+    global _FORMAT_CANDIDATES
+    if _FORMAT_CANDIDATES is None:
+        _FORMAT_CANDIDATES = _format_candidates()
+
+    vertical = 0
+    horizontal = 0
+    for i in range(15):
+        if i < 6:
+            v_bit = matrix[i][8]
+        elif i < 8:
+            v_bit = matrix[i + 1][8]
+        else:
+            v_bit = matrix[size - 15 + i][8]
+        if i < 8:
+            h_bit = matrix[8][size - i - 1]
+        elif i < 9:
+            h_bit = matrix[8][15 - i]
+        else:
+            h_bit = matrix[8][15 - i - 1]
+        vertical |= int(bool(v_bit)) << i
+        horizontal |= int(bool(h_bit)) << i
+
+    best = None
+    for bits, error_correction, mask_pattern in _FORMAT_CANDIDATES:
+        distance = min(bin(bits ^ vertical).count("1"), bin(bits ^ horizontal).count("1"))
+        if best is None or distance < best[0]:
+            best = (distance, error_correction, mask_pattern)
+    if best[0] > 3:
+        raise ValueError("形式情報を読み取れません")
+    return best[1], best[2]
+
+
+# ---- ビット列の解析 ----
+_ALPHANUMERIC = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:"
+
+
+class _BitReader:
+    def __init__(self, data):
+        self.data = data
+        self.position = 0
+
+    def remaining(self):
+        return len(self.data) * 8 - self.position
+
+    def read(self, count):
+        value = 0
+        for _ in range(count):
+            byte = self.data[self.position // 8]
+            bit = (byte >> (7 - self.position % 8)) & 1
+            value = (value << 1) | bit
+            self.position += 1
+        return value
+
+
+def _count_bits(mode, version):
+    index = 0 if version < 10 else 1 if version < 27 else 2
+    return {
+        0b0001: (10, 12, 14),
+        0b0010: (9, 11, 13),
+        0b0100: (8, 16, 16),
+        0b1000: (8, 10, 12),
+    }[mode][index]
+
+
+def _parse_segments(data, version):
+    reader = _BitReader(data)
+    result = bytearray()
+    while reader.remaining() >= 4:
+        mode = reader.read(4)
+        if mode == 0b0000:
+            break
+        if mode == 0b0111:  # ECI (指定子は読み飛ばす)
+            reader.read(8)
+            continue
+        if mode not in (0b0001, 0b0010, 0b0100, 0b1000):
+            raise ValueError(f"未対応のモードです: {mode:04b}")
+
+        count = reader.read(_count_bits(mode, version))
+        if mode == 0b0001:  # 数字
+            digits = []
+            while count >= 3:
+                digits.append(f"{reader.read(10):03d}")
+                count -= 3
+            if count == 2:
+                digits.append(f"{reader.read(7):02d}")
+            elif count == 1:
+                digits.append(f"{reader.read(4):01d}")
+            result += "".join(digits).encode("ascii")
+        elif mode == 0b0010:  # 英数字
+            chars = []
+            while count >= 2:
+                value = reader.read(11)
+                chars.append(_ALPHANUMERIC[value // 45] + _ALPHANUMERIC[value % 45])
+                count -= 2
+            if count == 1:
+                chars.append(_ALPHANUMERIC[reader.read(6)])
+            result += "".join(chars).encode("ascii")
+        elif mode == 0b0100:  # 8bitバイト
+            result += bytes(reader.read(8) for _ in range(count))
+        else:  # 漢字 (Shift_JIS)
+            sjis = bytearray()
+            for _ in range(count):
+                value = reader.read(13)
+                code = ((value // 0xC0) << 8) | (value % 0xC0)
+                code += 0x8140 if code + 0x8140 <= 0x9FFC else 0xC140
+                sjis += code.to_bytes(2, "big")
+            result += sjis.decode("shift_jis").encode("utf-8")
+
+    try:
+        return result.decode("utf-8")
+    except UnicodeDecodeError:
+        return result.decode("latin-1")
+
+
+def decode_matrix(matrix):
+    """
+    モジュールの行列 (True=黒) を読み取り、文字列を返します。読み取れなければ None。
+    """
+    size = len(matrix)
+    if size < 21 or (size - 17) % 4 != 0:
+        return None
+    version = (size - 17) // 4
+
+    try:
+        error_correction, mask_pattern = _read_format(matrix, size)
+    except ValueError:
+        return None
+
+    from qrcode.util import mask_func
+
+    mask = mask_func(mask_pattern)
+    order = qrspec.module_order(version)
+    blocks, codeword_block = qrspec.block_layout(version, error_correction)
+
+    # マスクを外しながら、配置順にコード語を組み立てる
+    codewords = []
+    value = 0
+    for index, (row, col) in enumerate(order[:len(codeword_block) * 8]):
+        bit = bool(matrix[row][col]) ^ bool(mask(row, col))
+        value = (value << 1) | bit
+        if index % 8 == 7:
+            codewords.append(value)
+            value = 0
+
+    # インターリーブを解いて、ブロックごとに誤り訂正する
+    block_codewords = [[] for _ in blocks]
+    for codeword, block_index in zip(codewords, codeword_block):
+        block_codewords[block_index].append(codeword)
+
+    data = bytearray()
+    for (total, data_count), received in zip(blocks, block_codewords):
+        try:
+            corrected = rs_correct(received, total - data_count)
+        except ValueError:
+            return None
+        data += bytes(corrected[:data_count])
+
+    try:
+        return _parse_segments(bytes(data), version)
+    except (ValueError, IndexError):
+        return None
+
+
+def sample_matrix(image):
+    """
+    傾きのない画像からモジュールの行列を読み取ります。見つからなければ None。
+    左上のファインダーパターン (7モジュール幅) の幅から1モジュールの大きさを求め、
+    各モジュールの中心のピクセルを見て白黒を判定します。
+    """
+    pixels = np.asarray(image.convert("L"))
+    dark = pixels < 128
+    rows = np.flatnonzero(dark.any(axis=1))
+    cols = np.flatnonzero(dark.any(axis=0))
+    if len(rows) == 0:
+        return None
+    top, bottom = rows[0], rows[-1]
+    left, right = cols[0], cols[-1]
+    width = right - left + 1
+
+    run = np.argmin(dark[top, left:right + 1]) if not dark[top, left:right + 1].all() else width
+    if run == 0:
+        return None
+    module = run / 7.0
+    size = int(round(width / module))
+    size = 17 + 4 * max(1, int(round((size - 17) / 4)))
+    if size > 177 or (bottom - top + 1) < width * 0.9:
+        return None
+
+    step = width / size
+    centers_x = (left + (np.arange(size) + 0.5) * step).astype(int)
+    centers_y = (top + (np.arange(size) + 0.5) * step).astype(int)
+    return dark[np.ix_(centers_y, centers_x)].tolist()
@@ -0,0 +1,149 @@
+# src/pixcelqr/qrspec.py
+
+"""
+QRコードの仕様 (ISO/IEC 18004) から、バージョンごとに決まる情報を計算するモジュール。
+- function_mask: 機能パターン (ファインダー・タイミング・アライメント・形式情報・型番情報)
+- module_order: データのビットを配置するマスの順番
+- codeword_map: 各マスがどのコード語 (バイト) に属するか
+- block_layout: RSブロックの構成と、コード語がどのブロックに属するか
+どれもバージョン (と誤り訂正レベル) だけで決まるので、結果はキャッシュします。
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+from generator import ALIGNMENT_PATTERN_COORDS, ERROR_CORRECT_L, ERROR_CORRECT_M
+
+# codeword_map で使う特別な値
+FUNCTION_MODULE = -1   # 機能パターン (データを置けない)
+REMAINDER_MODULE = -2  # 残余ビット (どのコード語にも属さない)
+
+# 小さいシンボルで、誤訂正を防ぐために訂正に使わない誤り訂正コード語の数 (仕様の p)
+# キーは (version, error_correction)
+MISDECODE_PROTECTION = {
+    (1, ERROR_CORRECT_L): 3,
+    (1, ERROR_CORRECT_M): 2,
+    (2, ERROR_CORRECT_L): 2,
+}
+
+
+def version_to_size(version):
+    return version * 4 + 17
+
+
+@lru_cache(maxsize=None)
+def function_mask(version):
+    """
+    機能パターンのマスを True にした size x size の配列を返します。
+    QArtGenerator.safe_area_map と違い、形式情報・型番情報・ダークモジュールも含みます。
+    """
+    size = version_to_size(version)
+    mask = np.zeros((size, size), dtype=bool)
+
+    # ファインダーパターン + セパレータ + 形式情報 (左上は9x9, 右上・左下は8x9)
+    mask[:9, :9] = True
+    mask[:9, size - 8:] = True
+    mask[size - 8:, :9] = True
+
+    # タイミングパターン
+    mask[6, :] = True
+    mask[:, 6] = True
+
+    # アライメントパターン (ファインダーと重なる位置には置かれない)
+    coords = ALIGNMENT_PATTERN_COORDS[version]
+    for y_center in coords:
+        for x_center in coords:
+            is_near_finder = (y_center < 9 and x_center < 9) or \
+                             (y_center < 9 and x_center > size - 9) or \
+                             (y_center > size - 9 and x_center < 9)
+            if is_near_finder:
+                continue
+            mask[y_center - 2:y_center + 3, x_center - 2:x_center + 3] = True
+
+    # 型番情報 (バージョン7以上)
+    if version >= 7:
+        mask[:6, size - 11:size - 8] = True
+        mask[size - 11:size - 8, :6] = True
+
+    mask.setflags(write=False)
+    return mask
+
+
+@lru_cache(maxsize=None)
+def module_order(version):
+    """
+    データのビットが配置される順番に並べた (row, col) のタプルを返します。
+    右下から2列ずつ、上下にジグザグに進みます (6列目のタイミングパターンは飛ばす)。
+    """
+    mask = function_mask(version)
+    size = version_to_size(version)
+    order = []
+    upward = True
+    col = size - 1
+    while col > 0:
+        if col == 6:
+            col -= 1
+        rows = range(size - 1, -1, -1) if upward else range(size)
+        for row in rows:
+            for c in (col, col - 1):
+                if not mask[row, c]:
+                    order.append((row, c))
+        upward = not upward
+        col -= 2
+    return tuple(order)
+
+
+@lru_cache(maxsize=None)
+def codeword_map(version):
+    """
+    各マスが何番目のコード語に属するかを表す int 配列を返します。
+    機能パターンは FUNCTION_MODULE、残余ビットは REMAINDER_MODULE になります。
+    """
+    size = version_to_size(version)
+    cw_map = np.full((size, size), FUNCTION_MODULE, dtype=np.int32)
+    order = module_order(version)
+    full_bytes = len(order) // 8
+    for index, (row, col) in enumerate(order):
+        cw_map[row, col] = index // 8 if index // 8 < full_bytes else REMAINDER_MODULE
+    cw_map.setflags(write=False)
+    return cw_map
+
+
+@lru_cache(maxsize=None)
+def block_layout(version, error_correction):
+    """
+    (blocks, codeword_block) を返します。
+    - blocks: 各RSブロックの (総コード語数, データコード語数) のタプル
+    - codeword_block: 配置順のコード語番号 -> ブロック番号 の配列
+    コード語はブロックをまたいでインターリーブされて配置されます。
+    """
+    from qrcode.base import rs_blocks
+
+    blocks = tuple((b.total_count, b.data_count) for b in rs_blocks(version, error_correction))
+    max_data = max(data for _, data in blocks)
+    max_ec = max(total - data for total, data in blocks)
+
+    owner = []
+    for i in range(max_data):
+        for block_index, (_, data) in enumerate(blocks):
+            if i < data:
+                owner.append(block_index)
+    for i in range(max_ec):
+        for block_index, (total, data) in enumerate(blocks):
+            if i < total - data:
+                owner.append(block_index)
+
+    codeword_block = np.array(owner, dtype=np.int32)
+    codeword_block.setflags(write=False)
+    return blocks, codeword_block
+
+
+def error_budget(version, error_correction):
+    """
+    各ブロックで訂正できるコード語の数 ((総数 - データ数 - p) // 2) のリストを返します。
+    p は MISDECODE_PROTECTION の値で、1-L, 1-M, 2-L 以外は 0 です。
+    """
+    blocks, _ = block_layout(version, error_correction)
+    p = MISDECODE_PROTECTION.get((version, error_correction), 0)
+    return [(total - data - p) // 2 for total, data in blocks]
@@ -0,0 +1,203 @@
+# src/pixcelqr/refiner.py
+
+"""
+焼きなまし法 (simulated annealing) で、QArtGenerator の行列を目標の絵に近づけるモジュール。
+
+安全なマス (safe_area_map が 0 で、形式情報などでもないマス) だけを反転の候補にし、
+各RSブロックの「壊れたコード語の数」が訂正能力 - margin を超えない範囲で反転を受け入れます。
+壊れたコード語は符号化したままの行列 (qart.base_matrix) と比べて数えるので、
+flip_dot で既に手を入れた行列から始めても、その分の誤りも含めて数えます。
+見た目の近さは 3x3 でぼかした画像同士の二乗誤差で測り、1回の反転で変わる
+周囲9マス分だけを差分計算するので、提案1回あたりの計算量は O(1) です。
+
+    refiner = ArtRefiner(qart, target_image, margin=1)
+    refiner.run(iterations=200_000)
+    refiner.apply()  # qart.matrix に結果を書き戻す
+"""
+
+import math
+
+import numpy as np
+
+import qrspec
+
+# 見た目の比較に使うぼかしのカーネル (合計 1)
+KERNEL = (
+    (1 / 16, 2 / 16, 1 / 16),
+    (2 / 16, 4 / 16, 2 / 16),
+    (1 / 16, 2 / 16, 1 / 16),
+)
+
+
+def _to_target_array(target, size):
+    """
+    目標の絵を size x size の float 配列 (1.0 = 黒, 0.0 = 白) に変換します。
+    PIL の画像なら縮小してグレースケールに、配列ならそのまま使います。
+    """
+    if hasattr(target, "convert"):
+        from PIL import Image
+
+        img = target.convert("L").resize((size, size), Image.LANCZOS)
+        return 1.0 - np.asarray(img, dtype=np.float64) / 255.0
+    array = np.asarray(target, dtype=np.float64)
+    if array.shape != (size, size):
+        raise ValueError(f"target の形は ({size}, {size}) である必要があります: {array.shape}")
+    return array
+
+
+def _blur(values):
+    """
+    周囲1マスを余白にした (size+2) x (size+2) の配列に、KERNEL でぼかしをかけます。
+    """
+    padded = np.pad(values, 2)
+    out = np.zeros((values.shape[0] + 2, values.shape[1] + 2))
+    for dr in range(3):
+        for dc in range(3):
+            out += KERNEL[dr][dc] * padded[dr:dr + out.shape[0], dc:dc + out.shape[1]]
+    return out
+
+
+class ArtRefiner:
+    def __init__(self, qart, target, margin=0):
+        self.qart = qart
+        self.size = size = qart.size
+        self.width = width = size + 2  # 余白を含めた横幅
+
+        blocks, codeword_block = qrspec.block_layout(qart.version, qart.error_correction)
+        cw_map = qrspec.codeword_map(qart.version)
+        safe = np.array(qart.safe_area_map) == 0
+        candidates = safe & (cw_map != qrspec.FUNCTION_MODULE)
+
+        # 誤りは符号化したままの行列 (base_matrix) との差で数える。
+        # flip_dot などで既に書き換えたマスも、最初から誤りとして数えておく
+        original = np.array(qart.base_matrix, dtype=np.int8)
+        current = np.array(qart.matrix, dtype=np.int8)
+        target_array = _to_target_array(target, size)
+
+        codeword_diff = np.zeros(len(codeword_block), dtype=np.int64)
+        changed = (current != original).ravel() & (cw_map.ravel() >= 0)
+        np.add.at(codeword_diff, cw_map.ravel()[changed], 1)
+        block_errors = np.bincount(codeword_block[codeword_diff > 0], minlength=len(blocks))
+
+        # 内側のループでは numpy のスカラー参照が遅いので、平坦な list で状態を持つ
+        self._original = original.ravel().tolist()
+        self._state = current.ravel().tolist()
+        self._module_codeword = cw_map.ravel().tolist()
+        self._codeword_block = codeword_block.tolist()
+        self._codeword_diff = codeword_diff.tolist()
+        self._block_errors = block_errors.tolist()
+        budgets = qrspec.error_budget(qart.version, qart.error_correction)
+        self._block_budget = [max(0, budget - margin) for budget in budgets]
+        self._blur = _blur(current.astype(np.float64)).ravel().tolist()
+        self._target_blur = _blur(target_array).ravel().tolist()
+        self._candidates = np.flatnonzero(candidates.ravel()).tolist()
+
+        # フリップしたマス (r, c) の周囲9マスの、余白込み配列でのオフセットと重み
+        self._neighbors = [
+            (dr * width + dc, KERNEL[dr][dc]) for dr in range(3) for dc in range(3)
+        ]
+        self.score = self._full_score()
+
+    def _full_score(self):
+        return sum((b - t) ** 2 for b, t in zip(self._blur, self._target_blur))
+
+    def run(self, iterations=100_000, t_start=0.05, t_end=0.0005, seed=None):
+        """
+        焼きなましを iterations 回の提案だけ行い、統計情報を辞書で返します。
+        温度は t_start から t_end まで指数的に下げます。
+        """
+        if not self._candidates:
+            return {"proposals": 0, "accepted": 0, "rejected_budget": 0, "score": self.score}
+
+        rng = np.random.default_rng(seed)
+        picks = rng.integers(0, len(self._candidates), size=iterations).tolist()
+        uniforms = rng.random(iterations).tolist()
+        cooling = (t_end / t_start) ** (1.0 / max(1, iterations - 1))
+
+        candidates = self._candidates
+        state = self._state
+        original = self._original
+        module_codeword = self._module_codeword
+        codeword_block = self._codeword_block
+        codeword_diff = self._codeword_diff
+        block_errors = self._block_errors
+        block_budget = self._block_budget
+        blur = self._blur
+        target_blur = self._target_blur
+        neighbors = self._neighbors
+        size = self.size
+        width = self.width
+        exp = math.exp
+
+        temperature = t_start
+        score = self.score
+        accepted = 0
+        rejected_budget = 0
+
+        for pick, uniform in zip(picks, uniforms):
+            index = candidates[pick]
+            new_value = 1 - state[index]
+            codeword = module_codeword[index]
+
+            # RSブロックの訂正能力を超えないかチェック
+            block = -1
+            block_delta = 0
+            if codeword >= 0:
+                diff_delta = 1 if new_value != original[index] else -1
+                new_diff = codeword_diff[codeword] + diff_delta
+                if new_diff == 1 and diff_delta == 1:
+                    block = codeword_block[codeword]
+                    if block_errors[block] + 1 > block_budget[block]:
+                        rejected_budget += 1
+                        temperature *= cooling
+                        continue
+                    block_delta = 1
+                elif new_diff == 0:
+                    block = codeword_block[codeword]
+                    block_delta = -1
+
+            # ぼかし画像の周囲9マス分だけ誤差の変化を計算する
+            d = 1.0 if new_value else -1.0
+            base = (index // size) * width + (index % size)
+            delta = 0.0
+            for offset, weight in neighbors:
+                p = base + offset
+                dw = d * weight
+                delta += dw * (2.0 * (blur[p] - target_blur[p]) + dw)
+
+            if delta <= 0.0 or uniform < exp(-delta / temperature):
+                state[index] = new_value
+                for offset, weight in neighbors:
+                    blur[base + offset] += d * weight
+                if codeword >= 0:
+                    codeword_diff[codeword] += diff_delta
+                    if block_delta:
+                        block_errors[block] += block_delta
+                score += delta
+                accepted += 1
+            temperature *= cooling
+
+        self.score = score
+        return {
+            "proposals": iterations,
+            "accepted": accepted,
+            "rejected_budget": rejected_budget,
+            "score": score,
+            "block_errors": list(block_errors),
+            "block_budget": list(block_budget),
+        }
+
+    @property
+    def matrix(self):
+        """
+        現在の状態を QArtGenerator.matrix と同じ bool の二次元リストで返します。
+        """
+        size = self.size
+        return [[bool(v) for v in self._state[r * size:(r + 1) * size]] for r in range(size)]
+
+    def apply(self):
+        """
+        現在の状態を元の QArtGenerator に書き戻し、ハッシュを計算し直します。
+        """
+        self.qart.matrix = self.matrix
+        self.qart.rehash()
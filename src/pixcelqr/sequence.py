@@ -0,0 +1,303 @@
+# src/pixcelqr/sequence.py
+
+"""
+データは同じまま、絵だけがフレームごとに変わるアニメーションQRコードを作るモジュール。
+
+QRコードの符号化と安全な領域の計算は最初に1回だけ行い、各フレームは
+「前のフレームから変わったマス」の差分として記録します。
+最初の add_frame は、元のQRコードに edits を適用したものを1フレーム目にします。
+- 読み取れるかどうかは、変わったマスが属するRSブロックだけを数え直して判定します
+- APNG と GIF は変わった範囲 (矩形) だけを各フレームとして書き出します
+
+    seq = QArtSequence("https://example.com/")
+    for edits in frames:            # edits は (row, col, is_black) の並び
+        seq.add_frame(edits, delay_ms=80)
+    seq.save_apng("anim.png")
+"""
+
+import struct
+import zlib
+from typing import NamedTuple
+
+import numpy as np
+
+import qrspec
+from generator import ERROR_CORRECT_H, QArtGenerator
+
+
+def _png_chunk(tag, data):
+    """PNG のチャンク (長さ + 種類 + データ + CRC) を作ります。"""
+    return (struct.pack(">I", len(data)) + tag + data
+            + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF))
+
+
+# 表示時間の上限。APNG の delay_num は 1/1000 秒単位の16bitなので 65535ms まで
+# (GIF は 1/100 秒単位の16bitなので、この範囲なら収まります)
+MAX_DELAY_MS = 0xFFFF
+
+
+def _gif_lzw(indices, min_code_size=2):
+    """
+    パレット番号の並びを GIF の LZW で圧縮し、255バイトごとのサブブロックに分けて返します。
+    """
+    clear = 1 << min_code_size
+    end = clear + 1
+    out = bytearray()
+    table = {}
+    code_size = min_code_size + 1
+    next_code = end + 1
+    # 出力するビットは下位から詰めていく
+    bits = clear
+    bit_count = code_size
+
+    it = iter(indices)
+    prefix = next(it)
+    for symbol in it:
+        key = (prefix << 8) | symbol
+        code = table.get(key)
+        if code is not None:
+            prefix = code
+            continue
+
+        bits |= prefix << bit_count
+        bit_count += code_size
+        while bit_count >= 8:
+            out.append(bits & 0xFF)
+            bits >>= 8
+            bit_count -= 8
+
+        if next_code < 4096:
+            table[key] = next_code
+            next_code += 1
+            if next_code > (1 << code_size) and code_size < 12:
+                code_size += 1
+        else:
+            # 辞書がいっぱいになったら作り直す
+            bits |= clear << bit_count
+            bit_count += code_size
+            table.clear()
+            code_size = min_code_size + 1
+            next_code = end + 1
+        prefix = symbol
+
+    bits |= prefix << bit_count
+    bit_count += code_size
+    bits |= end << bit_count
+    bit_count += code_size
+    while bit_count > 0:
+        out.append(bits & 0xFF)
+        bits >>= 8
+        bit_count -= 8
+
+    blocks = bytearray([min_code_size])
+    for i in range(0, len(out), 255):
+        chunk = out[i:i + 255]
+        blocks.append(len(chunk))
+        blocks += chunk
+    blocks.append(0)
+    return bytes(blocks)
+
+
+class FrameReport(NamedTuple):
+    index: int
+    changed: int            # 実際に変わったマスの数
+    rejected: int           # 機能パターンなどで変更できなかったマスの数
+    bbox: tuple             # 変わった範囲 (row0, col0, row1, col1)。変化がなければ None
+    within_budget: bool     # すべてのRSブロックが訂正能力の範囲内か
+    over_budget_blocks: tuple
+
+
+class QArtSequence:
+    def __init__(self, data, error_correction=ERROR_CORRECT_H, margin=0):
+        self.base = QArtGenerator(data, error_correction=error_correction)
+        version = self.base.version
+
+        self._base_matrix = np.array(self.base.matrix, dtype=bool)
+        self._current = self._base_matrix.copy()
+        cw_map = qrspec.codeword_map(version)
+        self._editable = (np.array(self.base.safe_area_map) == 0) & (cw_map != qrspec.FUNCTION_MODULE)
+        self._module_codeword = cw_map
+
+        blocks, codeword_block = qrspec.block_layout(version, error_correction)
+        self._codeword_block = codeword_block
+        self._codeword_diff = np.zeros(len(codeword_block), dtype=np.int32)
+        self._block_errors = np.zeros(len(blocks), dtype=np.int32)
+        budgets = qrspec.error_budget(version, error_correction)
+        self._block_budget = np.array([max(0, budget - margin) for budget in budgets], dtype=np.int32)
+        self._over_budget = set()
+
+        # 各フレームは (元のQRコード or 前のフレームから変わったマスのリスト, 表示時間[ms]) で持つ。
+        # add_frame がまだ呼ばれていなければ、元のQRコードだけの1フレームになる
+        self.frames = [([], 100)]
+        self._has_frames = False
+
+    @property
+    def size(self):
+        return self.base.size
+
+    @property
+    def matrix(self):
+        """最後に追加したフレームの行列 (bool の二次元リスト)。"""
+        return self._current.tolist()
+
+    def add_frame(self, edits, delay_ms=100):
+        """
+        前のフレームに edits ((row, col, is_black) の並び) を適用した新しいフレームを追加します。
+        1回目は元のQRコードに適用したものが最初のフレームになります。
+        (元のQRコードをそのまま見せたいときは、最初に add_frame([]) を呼んでください)
+        delay_ms は 0 から MAX_DELAY_MS (65535) までです。
+        """
+        if not 0 <= delay_ms <= MAX_DELAY_MS:
+            raise ValueError(f"delay_ms は 0 から {MAX_DELAY_MS} の範囲で指定してください: {delay_ms}")
+
+        changes = []
+        rejected = 0
+        touched_blocks = set()
+        for row, col, is_black in edits:
+            if not (0 <= row < self.size and 0 <= col < self.size) or not self._editable[row, col]:
+                rejected += 1
+                continue
+            is_black = bool(is_black)
+            if self._current[row, col] == is_black:
+                continue
+            self._current[row, col] = is_black
+            changes.append((row, col, is_black))
+
+            codeword = self._module_codeword[row, col]
+            if codeword >= 0:
+                before = self._codeword_diff[codeword]
+                after = before + (1 if is_black != self._base_matrix[row, col] else -1)
+                self._codeword_diff[codeword] = after
+                if (before == 0) != (after == 0):
+                    block = self._codeword_block[codeword]
+                    self._block_errors[block] += 1 if after else -1
+                    touched_blocks.add(block)
+
+        # 変化のあったブロックだけ訂正能力と比べる (他のブロックは前のフレームのまま)
+        for block in touched_blocks:
+            if self._block_errors[block] > self._block_budget[block]:
+                self._over_budget.add(block)
+            else:
+                self._over_budget.discard(block)
+
+        if self._has_frames:
+            self.frames.append((changes, delay_ms))
+        else:
+            # 1回目は元のQRコードのフレームを置き換える
+            self.frames[0] = (changes, delay_ms)
+            self._has_frames = True
+        bbox = None
+        if changes:
+            rows = [r for r, _, _ in changes]
+            cols = [c for _, c, _ in changes]
+            bbox = (min(rows), min(cols), max(rows) + 1, max(cols) + 1)
+        return FrameReport(
+            index=len(self.frames) - 1,
+            changed=len(changes),
+            rejected=rejected,
+            bbox=bbox,
+            within_budget=not self._over_budget,
+            over_budget_blocks=tuple(sorted(int(b) for b in self._over_budget)),
+        )
+
+    def add_frame_matrix(self, matrix, delay_ms=100):
+        """
+        フレーム全体の行列を渡して追加します。前のフレームとの差分だけが記録されます。
+        """
+        target = np.asarray(matrix, dtype=bool)
+        rows, cols = np.nonzero(target != self._current)
+        edits = zip(rows.tolist(), cols.tolist(), target[rows, cols].tolist())
+        return self.add_frame(edits, delay_ms=delay_ms)
+
+    def _iter_frames(self, box_size, border):
+        """
+        (画像バッファ, 変わったピクセルの範囲 (y0, x0, y1, x1), 表示時間) を順に返します。
+        バッファは使い回すので、変わったマスの分だけ塗り直します。
+        """
+        modules = np.pad(self._base_matrix, border)
+        buffer = np.where(
+            np.repeat(np.repeat(modules, box_size, axis=0), box_size, axis=1), 0, 255
+        ).astype(np.uint8)
+        height, width = buffer.shape
+
+        for index, (changes, delay_ms) in enumerate(self.frames):
+            if index == 0:
+                # 最初のフレームは元のQRコードに変更を適用した画像全体
+                for row, col, is_black in changes:
+                    y = (row + border) * box_size
+                    x = (col + border) * box_size
+                    buffer[y:y + box_size, x:x + box_size] = 0 if is_black else 255
+                yield buffer, (0, 0, height, width), delay_ms
+                continue
+            if not changes:
+                yield buffer, None, delay_ms
+                continue
+            y0 = x0 = None
+            y1 = x1 = 0
+            for row, col, is_black in changes:
+                y = (row + border) * box_size
+                x = (col + border) * box_size
+                buffer[y:y + box_size, x:x + box_size] = 0 if is_black else 255
+                y0 = y if y0 is None else min(y0, y)
+                x0 = x if x0 is None else min(x0, x)
+                y1 = max(y1, y + box_size)
+                x1 = max(x1, x + box_size)
+            yield buffer, (y0, x0, y1, x1), delay_ms
+
+    def save_apng(self, path, box_size=10, border=4, loop=0):
+        """
+        APNG として保存します。2フレーム目以降は変わった矩形だけを書き出します。
+        """
+        image_size = (self.size + border * 2) * box_size
+
+        def encode(pixels):
+            rows = np.zeros((pixels.shape[0], pixels.shape[1] + 1), dtype=np.uint8)
+            rows[:, 1:] = pixels
+            return zlib.compress(rows.tobytes())
+
+        sequence_number = 0
+        with open(path, "wb") as f:
+            f.write(b"\x89PNG\r\n\x1a\n")
+            f.write(_png_chunk(b"IHDR", struct.pack(">IIBBBBB", image_size, image_size, 8, 0, 0, 0, 0)))
+            f.write(_png_chunk(b"acTL", struct.pack(">II", len(self.frames), loop)))
+
+            for index, (buffer, rect, delay_ms) in enumerate(self._iter_frames(box_size, border)):
+                if rect is None:
+                    rect = (0, 0, 1, 1)  # 変化のないフレームは1ピクセルだけ書き直す
+                y0, x0, y1, x1 = rect
+                # dispose_op=0 (そのまま残す), blend_op=0 (上書き)
+                f.write(_png_chunk(b"fcTL", struct.pack(
+                    ">IIIIIHHBB", sequence_number, x1 - x0, y1 - y0, x0, y0, delay_ms, 1000, 0, 0
+                )))
+                sequence_number += 1
+                data = encode(buffer[y0:y1, x0:x1])
+                if index == 0:
+                    f.write(_png_chunk(b"IDAT", data))
+                else:
+                    f.write(_png_chunk(b"fdAT", struct.pack(">I", sequence_number) + data))
+                    sequence_number += 1
+            f.write(_png_chunk(b"IEND", b""))
+
+    def save_gif(self, path, box_size=10, border=4, loop=0):
+        """
+        GIF として保存します。APNG と同じく、2フレーム目以降は変わった矩形だけを書き出すので、
+        フレームをまとめてメモリに持つことはありません。
+        """
+        image_size = (self.size + border * 2) * box_size
+
+        with open(path, "wb") as f:
+            f.write(b"GIF89a")
+            # グローバルカラーテーブル (2色: 0=白, 1=黒) を使う
+            f.write(struct.pack("<HHBBB", image_size, image_size, 0x80, 0, 0))
+            f.write(b"\xff\xff\xff\x00\x00\x00")
+            f.write(b"\x21\xff\x0bNETSCAPE2.0" + struct.pack("<BBHB", 3, 1, loop, 0))
+
+            for buffer, rect, delay_ms in self._iter_frames(box_size, border):
+                if rect is None:
+                    rect = (0, 0, 1, 1)  # 変化のないフレームは1ピクセルだけ書き直す
+                y0, x0, y1, x1 = rect
+                # disposal=1 (そのまま残す)。GIF の表示時間は 1/100 秒単位
+                f.write(struct.pack("<BBBBHBB", 0x21, 0xF9, 4, 1 << 2, round(delay_ms / 10), 0, 0))
+                f.write(struct.pack("<BHHHHB", 0x2C, x0, y0, x1 - x0, y1 - y0, 0))
+                f.write(_gif_lzw((buffer[y0:y1, x0:x1] == 0).ravel().tolist()))
+            f.write(b"\x3b")
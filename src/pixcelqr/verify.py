@@ -0,0 +1,215 @@
+# src/pixcelqr/verify.py
+
+"""
+QRコードが読み取れるかを確認する「検証器」を差し替えられるようにするモジュール。
+
+- PyzbarVerifier: zbar (pyzbar) で読み取る (これまでの is_readable と同じ)
+- OpenCVVerifier: OpenCV の QRCodeDetector.detectAndDecodeMulti で読み取る
+- MatrixVerifier: qrdecode の小さなデコーダーで、外部ライブラリなしに読み取る
+- ConsensusVerifier: 複数の検証器の結果を "all" (全員一致) か "any" (誰か1つ) でまとめる
+
+どの検証器も decode_batch で複数の画像をまとめて読み取れます。
+pyzbar は画像を1枚のコンタクトシートに並べ、1回の呼び出しで全部を読み取ります。
+(OpenCV もシートで読めますが、既定では1枚ずつ読みます。OpenCVVerifier を参照)
+シートでは見落とすことがあるので、何も読み取れなかった画像だけは1枚ずつ読み直します。
+"""
+
+import math
+
+
+def compose_contact_sheet(images, columns=None, gap=16):
+    """
+    画像をグリッド状に並べた1枚の画像と、各画像の位置 (left, top, right, bottom) を返します。
+    """
+    from PIL import Image
+
+    if columns is None:
+        columns = max(1, math.ceil(math.sqrt(len(images))))
+    rows = math.ceil(len(images) / columns)
+    cell_w = max(img.width for img in images) + gap
+    cell_h = max(img.height for img in images) + gap
+
+    sheet = Image.new("L", (columns * cell_w + gap, rows * cell_h + gap), "white")
+    boxes = []
+    for index, img in enumerate(images):
+        left = gap + (index % columns) * cell_w
+        top = gap + (index // columns) * cell_h
+        sheet.paste(img.convert("L"), (left, top))
+        boxes.append((left, top, left + img.width, top + img.height))
+    return sheet, boxes
+
+
+def _tile_index(boxes, x, y):
+    for index, (left, top, right, bottom) in enumerate(boxes):
+        if left <= x < right and top <= y < bottom:
+            return index
+    return None
+
+
+def _retry_missing(verifier, images, results):
+    """
+    コンタクトシートで何も読み取れなかった画像を、1枚ずつ decode で読み直します。
+    (シートでは1枚で読めるコードを見落とすことがあるため)
+    """
+    for index, decoded in enumerate(results):
+        if not decoded:
+            results[index] = verifier.decode(images[index])
+    return results
+
+
+class Verifier:
+    """
+    検証器の基本クラス。decode か decode_batch のどちらかを実装します。
+    """
+
+    name = "base"
+
+    def decode(self, image):
+        """画像から読み取れた文字列のリストを返します。"""
+        return self.decode_batch([image])[0]
+
+    def decode_batch(self, images):
+        """画像ごとに、読み取れた文字列のリストを返します。"""
+        return [self.decode(image) for image in images]
+
+    def verify(self, image, expected):
+        return expected in self.decode(image)
+
+    def verify_batch(self, images, expected_list):
+        results = self.decode_batch(images)
+        return [expected in decoded for decoded, expected in zip(results, expected_list)]
+
+
+class PyzbarVerifier(Verifier):
+    name = "pyzbar"
+
+    def decode(self, image):
+        from pyzbar.pyzbar import decode
+
+        return [symbol.data.decode("utf-8") for symbol in decode(image)]
+
+    def decode_batch(self, images):
+        from pyzbar.pyzbar import decode
+
+        if len(images) <= 1:
+            return [self.decode(image) for image in images]
+
+        sheet, boxes = compose_contact_sheet(images)
+        results = [[] for _ in images]
+        for symbol in decode(sheet):
+            left, top, width, height = symbol.rect
+            index = _tile_index(boxes, left + width / 2, top + height / 2)
+            if index is not None:
+                results[index].append(symbol.data.decode("utf-8"))
+        return _retry_missing(self, images, results)
+
+
+class OpenCVVerifier(Verifier):
+    """
+    detectAndDecodeMulti はシートが大きくなるほど遅くなり、16枚のシートでは
+    1枚ずつ読むより4〜5倍遅かったので、既定では検出器を使い回して1枚ずつ読みます。
+    contact_sheet=True にするとコンタクトシートでまとめて読みます。
+    """
+
+    name = "opencv"
+
+    def __init__(self, contact_sheet=False):
+        self._detector = None
+        self.contact_sheet = contact_sheet
+
+    def _detect(self, image):
+        import cv2
+        import numpy as np
+
+        if self._detector is None:
+            self._detector = cv2.QRCodeDetector()
+        pixels = np.asarray(image.convert("L"))
+        ok, decoded_info, points, _ = self._detector.detectAndDecodeMulti(pixels)
+        if not ok or points is None:
+            return []
+        return [
+            (text, points[i].mean(axis=0))
+            for i, text in enumerate(decoded_info)
+            if text
+        ]
+
+    def decode(self, image):
+        return [text for text, _ in self._detect(image)]
+
+    def decode_batch(self, images):
+        if len(images) <= 1 or not self.contact_sheet:
+            return [self.decode(image) for image in images]
+
+        sheet, boxes = compose_contact_sheet(images)
+        results = [[] for _ in images]
+        for text, (x, y) in self._detect(sheet):
+            index = _tile_index(boxes, x, y)
+            if index is not None:
+                results[index].append(text)
+        return _retry_missing(self, images, results)
+
+
+class MatrixVerifier(Verifier):
+    """
+    generate_image で作ったような傾きのない画像を、外部ライブラリなしで読み取ります。
+    """
+
+    name = "matrix"
+
+    def decode(self, image):
+        from qrdecode import decode_matrix, sample_matrix
+
+        matrix = sample_matrix(image)
+        if matrix is None:
+            return []
+        text = decode_matrix(matrix)
+        return [] if text is None else [text]
+
+
+class ConsensusVerifier(Verifier):
+    """
+    複数の検証器の結果をまとめます。
+    - policy="all": すべての検証器が読み取れた文字列だけを残す
+    - policy="any": どれか1つでも読み取れた文字列を残す
+    """
+
+    def __init__(self, verifiers, policy="all"):
+        if policy not in ("all", "any"):
+            raise ValueError(f"policy は 'all' か 'any' です: {policy}")
+        self.verifiers = list(verifiers)
+        self.policy = policy
+        self.name = f"{policy}({','.join(v.name for v in self.verifiers)})"
+
+    def decode_batch(self, images):
+        per_verifier = [verifier.decode_batch(images) for verifier in self.verifiers]
+        results = []
+        for index in range(len(images)):
+            decoded = [results_of[index] for results_of in per_verifier]
+            if self.policy == "all":
+                merged = [text for text in decoded[0] if all(text in other for other in decoded[1:])]
+            else:
+                merged = []
+                for texts in decoded:
+                    merged.extend(text for text in texts if text not in merged)
+            results.append(merged)
+        return results
+
+
+VERIFIERS = {
+    "pyzbar": PyzbarVerifier,
+    "opencv": OpenCVVerifier,
+    "matrix": MatrixVerifier,
+}
+
+
+def get_verifier(name):
+    """
+    名前から検証器を作ります。"all:pyzbar,opencv" や "any:opencv,matrix" のように書くと
+    ConsensusVerifier になります。
+    """
+    if ":" in name:
+        policy, names = name.split(":", 1)
+        return ConsensusVerifier([get_verifier(n) for n in names.split(",")], policy=policy)
+    if name not in VERIFIERS:
+        raise ValueError(f"不明な検証器です: {name}")
+    return VERIFIERS[name]()